@@ -0,0 +1,301 @@
+"""Assembler class and disassemble function that turn Programs into pyscript assembly (.ass) and back
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from array import array
+from ast import literal_eval
+from collections import Counter
+import logging
+from pathlib import Path
+import re
+from typing import Any, NoReturn
+
+from compiler import TILE_ACTIONS
+from enums import Opcode, OperandKind
+from parser import describe_location
+from program import add_constant, OPERAND_KINDS, Program
+
+logger = logging.getLogger(__name__)
+
+ASSEMBLY_EXTENSION = ".ass"
+INDENT = "    "
+SLOT_INDEX_SEPARATOR = "#" # "x#3" is slot 3, for names defined more than once
+SLOTS_DIRECTIVE = ".slots"
+FUNCTIONS_DIRECTIVE = ".functions"
+# floats that have no Python literal
+SPECIAL_FLOATS = ("inf", "-inf", "nan")
+OPCODES_BY_MNEMONIC = {opcode.name.lower(): opcode for opcode in Opcode}
+ACTION_INDICES_BY_NAME = {action.name.lower(): index for index, action in enumerate(TILE_ACTIONS)}
+ASSEMBLY_TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<comment>;.*)
+        | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+        | (?P<word>[^\s;"']+)
+        | (?P<error>\S)
+    )""", re.VERBOSE)
+
+
+class Assembler:
+    """Turns pyscript assembly into a Program.
+
+    Assembly has one instruction per line: the opcode's name in lowercase,
+    then its operands. Constants are Python literals, slots and functions
+    are written by name, actions and the operators of superinstructions by
+    their lowercase names, and jump targets as labels, defined by a line
+    like "loop:". A semicolon starts a comment.
+
+    ".slots x y x" and ".functions print" lines declare names in index order.
+    Names used without being declared get the next free index,
+    and a name declared for more than one slot must be used as "x#2",
+    with its slot index. Constants are numbered in order of appearance.
+    """
+    path: Path | None
+    code: array
+    constants: list[Any]
+    constant_indices: dict[tuple[type, Any], int]
+    slot_names: list[str]
+    slot_indices: dict[str, list[int]] # name -> every slot with that name
+    function_indices: dict[str, int]
+    labels: dict[str, int] # label -> offset
+    label_uses: list[tuple[int, str, int]] # (index in code, label, line number)
+    line_number: int
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self._reset()
+
+    def assemble(self, source: str) -> Program:
+        self._reset()
+        for self.line_number, line in enumerate(source.splitlines(), 1):
+            words = self._split(line)
+            if len(words) == 0:
+                continue
+            if words[0] == SLOTS_DIRECTIVE:
+                for name in words[1:]:
+                    self._add_slot(name)
+            elif words[0] == FUNCTIONS_DIRECTIVE:
+                for name in words[1:]:
+                    self.function_indices.setdefault(name, len(self.function_indices))
+            elif words[0].endswith(":") and len(words) == 1:
+                label = words[0][:-1]
+                if label in self.labels:
+                    self._raise_syntax_error(f"Label '{label}' is already defined")
+                self.labels[label] = len(self.code)
+            else:
+                self._add_instruction(words)
+
+        for index, label, self.line_number in self.label_uses:
+            if label not in self.labels:
+                self._raise_syntax_error(f"Label '{label}' is not defined")
+            self.code[index] = self.labels[label]
+
+        program = Program(
+            self.code,
+            tuple(self.constants),
+            tuple(self.slot_names),
+            tuple(self.function_indices),
+        )
+        logger.info("Assembled '%s' into %d ints", self.path, len(program.code))
+        self._reset()
+        return program
+
+    def _reset(self) -> None:
+        self.code = array("i")
+        self.constants = []
+        self.constant_indices = {}
+        self.slot_names = []
+        self.slot_indices = {}
+        self.function_indices = {}
+        self.labels = {}
+        self.label_uses = []
+        self.line_number = 0
+
+    def _split(self, line: str) -> list[str]:
+        words = []
+        for match in ASSEMBLY_TOKEN_PATTERN.finditer(line):
+            if match.group("error") is not None:
+                self._raise_syntax_error(f"Unexpected {match.group('error')!r}")
+            if match.group("comment") is None:
+                words.append(match.group("string") or match.group("word"))
+        return words
+
+    def _add_instruction(self, words: list[str]) -> None:
+        mnemonic, *operands = words
+        opcode = OPCODES_BY_MNEMONIC.get(mnemonic)
+        if opcode is None:
+            self._raise_syntax_error(f"Unknown instruction '{mnemonic}'")
+        if len(operands) != opcode.operand_count:
+            self._raise_syntax_error(f"'{mnemonic}' takes {opcode.operand_count} operands, found {len(operands)}")
+
+        self.code.append(opcode)
+        for kind, operand in zip(OPERAND_KINDS.get(opcode, ()), operands):
+            self.code.append(self._read_operand(kind, operand))
+
+    def _read_operand(self, kind: OperandKind, operand: str) -> int:
+        match kind:
+            case OperandKind.CONSTANT:
+                return self._get_constant_index(self._read_literal(operand))
+
+            case OperandKind.SLOT:
+                return self._get_slot(operand)
+
+            case OperandKind.FUNCTION:
+                return self.function_indices.setdefault(operand, len(self.function_indices))
+
+            case OperandKind.COUNT:
+                if not operand.isdigit():
+                    self._raise_syntax_error(f"Expected a count, found '{operand}'")
+                return int(operand)
+
+            case OperandKind.ACTION:
+                if operand not in ACTION_INDICES_BY_NAME:
+                    self._raise_syntax_error(f"Unknown action '{operand}'")
+                return ACTION_INDICES_BY_NAME[operand]
+
+            case OperandKind.LABEL:
+                # filled in once all labels are known
+                self.label_uses.append((len(self.code), operand, self.line_number))
+                return 0
+
+            case OperandKind.OPERATOR:
+                opcode = OPCODES_BY_MNEMONIC.get(operand)
+                if opcode is None or opcode < Opcode.ADD:
+                    self._raise_syntax_error(f"Unknown operator '{operand}'")
+                return opcode
+
+    def _read_literal(self, operand: str) -> Any:
+        if operand in SPECIAL_FLOATS:
+            return float(operand)
+        try:
+            value = literal_eval(operand)
+        except (ValueError, SyntaxError):
+            self._raise_syntax_error(f"Expected a literal, found '{operand}'")
+        if value is not None and not isinstance(value, (bool, int, float, str)):
+            self._raise_syntax_error(f"Expected a literal, found '{operand}'")
+        return value
+
+    def _get_slot(self, operand: str) -> int:
+        name, separator, index = operand.partition(SLOT_INDEX_SEPARATOR)
+        if separator != "":
+            if not index.isdigit() or int(index) >= len(self.slot_names) or self.slot_names[int(index)] != name:
+                self._raise_syntax_error(f"'{operand}' is not a declared slot")
+            return int(index)
+
+        indices = self.slot_indices.get(name)
+        if indices is None:
+            return self._add_slot(name)
+        if len(indices) > 1:
+            self._raise_syntax_error(f"'{name}' names more than one slot, use '{name}{SLOT_INDEX_SEPARATOR}<slot>'")
+        return indices[0]
+
+    def _add_slot(self, name: str) -> int:
+        self.slot_names.append(name)
+        self.slot_indices.setdefault(name, []).append(len(self.slot_names) - 1)
+        return len(self.slot_names) - 1
+
+    def _get_constant_index(self, value: Any) -> int:
+        return add_constant(self.constants, self.constant_indices, value)
+
+    def _raise_syntax_error(self, message: str) -> NoReturn:
+        raise SyntaxError(f"{message}{describe_location(self.line_number, 0, self.path)}")
+
+
+def disassemble(program: Program) -> str:
+    """Return a program as pyscript assembly, which Assembler turns back into the same program."""
+    slot_name_counts = Counter(program.slot_names)
+    targets = sorted({
+        operands[0]
+        for _offset, opcode, operands in program.iter_instructions()
+        if OPERAND_KINDS.get(opcode) == (OperandKind.LABEL,)
+    })
+    labels = {target: f"L{index}" for index, target in enumerate(targets)}
+
+    def format_operand(kind: OperandKind, operand: int) -> str:
+        match kind:
+            case OperandKind.CONSTANT:
+                return repr(program.constants[operand])
+            case OperandKind.SLOT:
+                name = program.slot_names[operand]
+                return name if slot_name_counts[name] == 1 else f"{name}{SLOT_INDEX_SEPARATOR}{operand}"
+            case OperandKind.FUNCTION:
+                return program.function_names[operand]
+            case OperandKind.COUNT:
+                return str(operand)
+            case OperandKind.ACTION:
+                return TILE_ACTIONS[operand].name.lower()
+            case OperandKind.LABEL:
+                return labels[operand]
+            case OperandKind.OPERATOR:
+                return Opcode(operand).name.lower()
+
+    lines = []
+    if len(program.slot_names) > 0:
+        lines.append(" ".join((SLOTS_DIRECTIVE, *program.slot_names)))
+    if len(program.function_names) > 0:
+        lines.append(" ".join((FUNCTIONS_DIRECTIVE, *program.function_names)))
+    for offset, opcode, operands in program.iter_instructions():
+        if offset in labels:
+            lines.append(f"{labels[offset]}:")
+        words = [opcode.name.lower()]
+        words.extend(format_operand(kind, operand) for kind, operand in zip(OPERAND_KINDS.get(opcode, ()), operands))
+        lines.append(INDENT + " ".join(words))
+    if len(program.code) in labels:
+        lines.append(f"{labels[len(program.code)]}:")
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from difflib import unified_diff
+    import sys
+
+    from bytecode_file import BYTECODE_EXTENSION, read_program, write_program
+    from common import PYSCRIPT_EXTENSION
+    from parser import FunctionHolder, Parser
+
+    argument_parser = ArgumentParser(description="Convert between pyscript, pyscript assembly and bytecode files.")
+    argument_parser.add_argument("input", type=Path, help=f"a {PYSCRIPT_EXTENSION}, {ASSEMBLY_EXTENSION} or {BYTECODE_EXTENSION} file")
+    argument_parser.add_argument(
+        "-o", "--output",
+        type=Path,
+        help=f"a {ASSEMBLY_EXTENSION} or {BYTECODE_EXTENSION} file to write, the assembly is printed without one",
+    )
+    argument_parser.add_argument("--no-optimize", action="store_true", help="don't optimize compiled pyscript")
+    # pyscript/test.ass is the golden file for pyscript/test.pyscript:
+    # python assembler.py pyscript/test.pyscript --check pyscript/test.ass
+    argument_parser.add_argument(
+        "--check",
+        type=Path,
+        help=f"a {ASSEMBLY_EXTENSION} file the assembly must match; differences are printed and the exit code is 1",
+    )
+    arguments = argument_parser.parse_args()
+
+    if arguments.input.suffix == ASSEMBLY_EXTENSION:
+        program = Assembler(arguments.input).assemble(arguments.input.read_text())
+    elif arguments.input.suffix == BYTECODE_EXTENSION:
+        program = read_program(arguments.input)
+    else:
+        parser = Parser(FunctionHolder(), arguments.input)
+        program = parser.compile(parser.parse(parser.tokenize_buffer()), optimize=not arguments.no_optimize)
+
+    if arguments.check is not None:
+        difference = list(unified_diff(
+            arguments.check.read_text().splitlines(keepends=True),
+            disassemble(program).splitlines(keepends=True),
+            str(arguments.check),
+            str(arguments.input),
+        ))
+        if len(difference) > 0:
+            sys.stdout.writelines(difference)
+            sys.exit(1)
+        print(f"'{arguments.input}' matches '{arguments.check}'")
+    elif arguments.output is None:
+        print(disassemble(program), end="")
+    elif arguments.output.suffix == BYTECODE_EXTENSION:
+        write_program(program, arguments.output)
+    else:
+        arguments.output.write_text(disassemble(program))
@@ -0,0 +1,107 @@
+"""Functions that store compiled Programs in bytecode files, which load without parsing
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from array import array
+import logging
+import marshal
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+import struct
+import sys
+
+from errors import BytecodeFileError
+from program import Program, make_instruction_indices
+
+logger = logging.getLogger(__name__)
+
+BYTECODE_EXTENSION = ".psb"
+MAGIC = b"PSBC"
+FORMAT_VERSION = 1 # bump whenever the layout or the meaning of the code changes
+# magic, format version, reserved, code length in ints, constants size, names size, reserved
+HEADER = struct.Struct("<4sHHIIII")
+INT_SIZE = 4
+
+
+def to_bytes(program: Program) -> bytes:
+    """Return the contents of a bytecode file holding a program.
+
+    After the header come the code and its instruction indices as little-endian
+    32-bit ints, so they can be used right where they are, then the
+    constants and the names, marshalled. The header is 24 bytes,
+    which keeps the ints aligned.
+    """
+    code = array("i", program.code)
+    indices = array("i", program.instruction_indices)
+    if sys.byteorder == "big":
+        code.byteswap()
+        indices.byteswap()
+    constants = marshal.dumps(program.constants)
+    names = marshal.dumps((program.slot_names, program.function_names))
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(code), len(constants), len(names), 0)
+    return b"".join((header, code.tobytes(), indices.tobytes(), constants, names))
+
+
+def from_buffer(buffer: bytes | memoryview | mmap) -> Program:
+    """Return the program in the contents of a bytecode file.
+
+    The program's code and instruction indices are views into buffer, not copies.
+    The indices are checked against the code, since a Processor counts fuel
+    with them and wrong ones could let a program run forever.
+    """
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise BytecodeFileError("Bytecode file is too short for its header")
+    magic, version, _reserved, code_length, constants_size, names_size, _reserved = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise BytecodeFileError("Not a bytecode file")
+    if version != FORMAT_VERSION:
+        raise BytecodeFileError(f"Bytecode file has format version {version}, expected {FORMAT_VERSION}")
+
+    code_start = HEADER.size
+    indices_start = code_start + code_length * INT_SIZE
+    constants_start = indices_start + code_length * INT_SIZE
+    names_start = constants_start + constants_size
+    if names_start + names_size != len(view):
+        raise BytecodeFileError("Bytecode file size doesn't match its header")
+
+    try:
+        constants = marshal.loads(view[constants_start:names_start])
+        slot_names, function_names = marshal.loads(view[names_start:])
+    except (EOFError, ValueError, TypeError) as e:
+        raise BytecodeFileError(f"Bytecode file has broken names or constants: {e}") from e
+
+    code = view[code_start:indices_start].cast("i")
+    indices = view[indices_start:constants_start].cast("i")
+    if sys.byteorder == "big":
+        code = array("i", code)
+        code.byteswap()
+        indices = array("i", indices)
+        indices.byteswap()
+    try:
+        expected_indices = make_instruction_indices(code)
+    except IndexError as e:
+        raise BytecodeFileError("Bytecode file has an unknown opcode") from e
+    if indices != expected_indices:
+        raise BytecodeFileError("Bytecode file's instruction indices don't match its code")
+    return Program(code, constants, slot_names, function_names, instruction_indices=indices)
+
+
+def write_program(program: Program, path: Path) -> None:
+    path.write_bytes(to_bytes(program))
+    logger.info("Wrote program to '%s'", path)
+
+
+def read_program(path: Path) -> Program:
+    """Load a program from a bytecode file by mapping it into memory."""
+    with open(path, "rb") as file:
+        try:
+            mapped = mmap(file.fileno(), 0, access=ACCESS_READ)
+        except ValueError as e:
+            raise BytecodeFileError(f"Bytecode file '{path}' is empty") from e
+    logger.info("Mapped program from '%s'", path)
+    return from_buffer(mapped)
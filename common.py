@@ -23,6 +23,7 @@ PROJECT_DIR = Path.cwd()
 USER_DATA_DIR = Path(user_data_dir(APP_NAME, APP_AUTHOR))
 SAVE_PATH = USER_DATA_DIR / "save.yaml"
 SOLUTIONS_DIR = USER_DATA_DIR / "solutions"
+CACHE_DIR = USER_DATA_DIR / "cache"
 
 FILE_DIALOG_OPTIONS = {
     "initialdir": SOLUTIONS_DIR,
@@ -0,0 +1,267 @@
+"""Compiler class that turns a ProcessTree into a Program
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from array import array
+from itertools import repeat
+import logging
+from pathlib import Path
+from typing import Any, Callable, NoReturn, TYPE_CHECKING
+
+from enums import NodeType, Opcode, TileAction
+from program import add_constant, Program
+
+if TYPE_CHECKING:
+    from parser import ProcessNode, ProcessTree
+
+logger = logging.getLogger(__name__)
+
+BINARY_OPCODES = {
+    '+':  Opcode.ADD,
+    '-':  Opcode.SUBTRACT,
+    '*':  Opcode.MULTIPLY,
+    '/':  Opcode.DIVIDE,
+    '//': Opcode.FLOOR_DIVIDE,
+    '%':  Opcode.MODULO,
+    '**': Opcode.POWER,
+    '==': Opcode.EQUAL,
+    '!=': Opcode.NOT_EQUAL,
+    '<':  Opcode.LESS,
+    '<=': Opcode.LESS_EQUAL,
+    '>':  Opcode.GREATER,
+    '>=': Opcode.GREATER_EQUAL,
+    }
+# builtins that make the tile do something; calling one ends the Processor's turn
+ACTION_FUNCTIONS = {
+    "move_forward": TileAction.MOVE_FORWARD,
+    "move_back":    TileAction.MOVE_BACK,
+    "turn_left":    TileAction.TURN_LEFT,
+    "turn_right":   TileAction.TURN_RIGHT,
+    "attack":       TileAction.ATTACK,
+    }
+TILE_ACTIONS = tuple(TileAction) # index in this tuple is the ACT operand
+
+# (function, argument) pairs on the compiler's work stack, run as function(argument)
+Task = tuple[Callable[[Any], None], Any]
+
+
+class BaseCompiler:
+    """The names, constants and functions of a program being compiled, for Compiler and PythonCompiler.
+
+    Names are resolved while compiling: every closure opens a scope,
+    and each definition gets its own slot, so inner definitions can shadow
+    outer ones without any lookups at run time.
+    """
+    path: Path | None
+    constants: list[Any]
+    constant_indices: dict[tuple[type, Any], int]
+    slot_names: list[str]
+    function_indices: dict[str, int]
+    scopes: list[dict[str, tuple[int, bool]]] # name -> (slot, is constant)
+    line: int # line of the statement being compiled
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self._reset()
+
+    def _reset(self) -> None:
+        self.constants = []
+        self.constant_indices = {}
+        self.slot_names = []
+        self.function_indices = {}
+        self.scopes = []
+        self.line = 0
+
+    def _open_scope(self) -> None:
+        self.scopes.append({})
+
+    def _close_scope(self, _node: None = None) -> None:
+        self.scopes.pop()
+
+    def _declare(self, keyword: str, name: str) -> int:
+        """Return a new slot for a definition in the innermost scope."""
+        scope = self.scopes[-1]
+        if name in scope:
+            self._raise_syntax_error(f"'{name}' is already defined")
+        slot = len(self.slot_names)
+        self.slot_names.append(name)
+        scope[name] = (slot, keyword == "const")
+        return slot
+
+    def _resolve(self, name: str) -> tuple[int, bool]:
+        """Return the slot of the innermost visible definition of a name and whether it's constant."""
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        self._raise_syntax_error(f"'{name}' is not defined")
+
+    def _resolve_variable(self, name: str) -> int:
+        """Return the slot of a name that's assigned to, which can't be a constant."""
+        slot, is_constant = self._resolve(name)
+        if is_constant:
+            self._raise_syntax_error(f"Can't assign to constant '{name}'")
+        return slot
+
+    def _get_constant_index(self, value: Any) -> int:
+        return add_constant(self.constants, self.constant_indices, value)
+
+    def _get_function_index(self, name: str) -> int:
+        return self.function_indices.setdefault(name, len(self.function_indices))
+
+    def _raise_syntax_error(self, message: str) -> NoReturn:
+        from parser import describe_location # parser imports this module
+        raise SyntaxError(f"{message}{describe_location(self.line, 0, self.path)}")
+
+
+class Compiler(BaseCompiler):
+    """Turns a ProcessTree into stack machine bytecode.
+
+    Operands are pushed in evaluation order and every operator or call
+    replaces them with its result, so each statement leaves the stack empty.
+
+    The tree is walked with an explicit stack of tasks, because the parser
+    makes trees of any depth. Every int of code is tagged with the line of
+    the statement it came from, for the profiler.
+    """
+    code: array
+    lines: array # source line of each int in code
+    tasks: list[Task]
+
+    def compile(self, tree: ProcessTree) -> Program:
+        self._reset()
+        self.tasks.append((self._visit_statement, tree.get_root()))
+        while self.tasks:
+            function, argument = self.tasks.pop()
+            function(argument)
+        # the end of the program belongs to no statement
+        self.line = 0
+        self._emit(Opcode.HALT)
+
+        program = Program(
+            self.code,
+            tuple(self.constants),
+            tuple(self.slot_names),
+            tuple(self.function_indices),
+            lines=self.lines,
+        )
+        logger.info(
+            "Compiled '%s' into %d ints, %d constants, %d slots",
+            self.path,
+            len(program.code),
+            len(program.constants),
+            len(program.slot_names),
+        )
+        self._reset()
+        return program
+
+    def _reset(self) -> None:
+        super()._reset()
+        self.code = array("i")
+        self.lines = array("I")
+        self.tasks = []
+
+    def _visit_statement(self, node: ProcessNode) -> None:
+        children = node.get_children()
+        if node.get_line() > 0:
+            self.line = node.get_line()
+        match node.get_type():
+            case NodeType.CLOSURE:
+                self._open_scope()
+                self.tasks.append((self._close_scope, None))
+                self.tasks.extend((self._visit_statement, child) for child in reversed(children))
+
+            case NodeType.LOOP:
+                condition, body = children
+                # condition, jump out if it's false, body, jump back to the condition
+                loop = [len(self.code), 0, self.line] # start offset, offset of the exit jump's target, line
+                self.tasks.append((self._finish_loop, loop))
+                self.tasks.append((self._visit_statement, body))
+                self.tasks.append((self._emit_loop_exit, loop))
+                self.tasks.append((self._visit_expression, condition))
+
+            case NodeType.DEFINE:
+                # the name only exists after its value, so "var x = x;" reads an outer x
+                self.tasks.append((self._define, node))
+                self._push_value(children)
+
+            case NodeType.WRITE:
+                slot = self._resolve_variable(node.get_value())
+                self.tasks.append((self._emit_later, (Opcode.STORE, slot)))
+                self.tasks.append((self._visit_expression, children[0]))
+
+            case NodeType.RETURN:
+                self.tasks.append((self._emit_later, (Opcode.RETURN,)))
+                self._push_value(children)
+
+            case NodeType.EXIT:
+                self.tasks.append((self._emit_later, (Opcode.EXIT,)))
+                self._push_value(children)
+
+            case _:
+                # the value of an expression statement isn't used
+                self.tasks.append((self._emit_later, (Opcode.POP,)))
+                self.tasks.append((self._visit_expression, node))
+
+    def _visit_expression(self, node: ProcessNode) -> None:
+        children = node.get_children()
+        match node.get_type():
+            case NodeType.LITERAL:
+                self._emit(Opcode.PUSH_CONST, self._get_constant_index(node.get_value()))
+
+            case NodeType.READ:
+                self._emit(Opcode.LOAD, self._resolve(node.get_value())[0])
+
+            case NodeType.CALL if node.get_value() in ACTION_FUNCTIONS:
+                if len(children) > 0:
+                    self._raise_syntax_error(f"'{node.get_value()}' takes no arguments")
+                action = ACTION_FUNCTIONS[node.get_value()]
+                self._emit(Opcode.ACT, TILE_ACTIONS.index(action))
+
+            case NodeType.CALL:
+                name = node.get_value()
+                function_index = self._get_function_index(name)
+                self.tasks.append((self._emit_later, (Opcode.CALL, function_index, len(children))))
+                self.tasks.extend((self._visit_expression, child) for child in reversed(children))
+
+            case NodeType.OPERATION:
+                if len(children) == 1:
+                    opcode = Opcode.NEGATE
+                else:
+                    opcode = BINARY_OPCODES[node.get_value()]
+                self.tasks.append((self._emit_later, (opcode,)))
+                self.tasks.extend((self._visit_expression, child) for child in reversed(children))
+
+            case node_type:
+                self._raise_syntax_error(f"{node_type} can't be used as a value")
+
+    def _push_value(self, children: list[ProcessNode]) -> None:
+        """Queue the optional value of a statement; a missing value is None."""
+        if len(children) > 0:
+            self.tasks.append((self._visit_expression, children[0]))
+        else:
+            self._emit(Opcode.PUSH_CONST, self._get_constant_index(None))
+
+    def _define(self, node: ProcessNode) -> None:
+        self._emit(Opcode.STORE, self._declare(*node.get_value()))
+
+    def _emit_loop_exit(self, loop: list[int]) -> None:
+        self._emit(Opcode.JUMP_IF_FALSE, 0)
+        loop[1] = len(self.code) - 1
+
+    def _finish_loop(self, loop: list[int]) -> None:
+        start, exit_target, self.line = loop
+        self._emit(Opcode.JUMP, start)
+        self.code[exit_target] = len(self.code)
+
+    def _emit(self, opcode: Opcode, *operands: int) -> None:
+        self.code.append(opcode)
+        self.code.extend(operands)
+        self.lines.extend(repeat(self.line, 1 + len(operands)))
+
+    def _emit_later(self, instruction: tuple[int, ...]) -> None:
+        """Task version of _emit, with the opcode and operands packed in one argument."""
+        self._emit(*instruction)
@@ -8,31 +8,44 @@ Contributors:
 import events
 from scheduler import Scheduler
 
+CYCLE_INTERVAL_MS = 250
+FAST_FORWARD_INTERVAL_MS = 1 # just enough for tkinter to redraw between cycles
+
 
 class CycleController:
     scheduler: Scheduler
     is_running: bool
+    is_fast_forward: bool # whether each cycle runs as many steps as fit in a frame
     after_id: str | None
 
     def __init__(self, scheduler: Scheduler) -> None:
         self.scheduler = scheduler
         self.is_running = False
+        self.is_fast_forward = False
         self.after_id = None
 
-    def start(self) -> None:
+    def start(self, fast_forward: bool = False) -> None:
         self.is_running = True
+        self.is_fast_forward = fast_forward
         events.CyclingToggled(True)
         self._cycle()
 
     def stop(self) -> None:
-        self.scheduler.after_cancel(self.after_id)
+        if self.after_id is not None:
+            # a cycle can stop the cycling before the next one is scheduled
+            self.scheduler.after_cancel(self.after_id)
         self.is_running = False
         self.after_id = None
         events.CyclingToggled(False)
 
     def _cycle(self) -> None:
+        self.after_id = None
         if not self.is_running:
             return
 
         events.Cycled()
-        self.after_id = self.scheduler.after(250, self._cycle)
+        if not self.is_running:
+            # the cycle stopped the cycling
+            return
+        interval = FAST_FORWARD_INTERVAL_MS if self.is_fast_forward else CYCLE_INTERVAL_MS
+        self.after_id = self.scheduler.after(interval, self._cycle)
@@ -48,6 +48,7 @@ class Editor(ttk.Notebook):
         events.FileSaveAsRequested.connect(lambda _: self.save_as())
         events.LevelOpened.connect(self._on_level_opened)
         events.LevelSelectOpened.connect(lambda _: self.open_tab(LEVEL_SELECT_PYSCRIPT_PATH))
+        events.ProfileUpdated.connect(self._on_profile_updated)
         events.RunButtonPressed.connect(self._on_run_button_pressed)
 
     def get_selected_tab(self) -> EditorTab | None:
@@ -137,7 +138,13 @@ class Editor(ttk.Notebook):
     def _on_level_opened(self, event: events.LevelOpened) -> None:
         self.open_tab_solution(event.level.pyscript_path)
 
-    def _on_run_button_pressed(self, _event: events.RunButtonPressed) -> None:
+    def _on_profile_updated(self, event: events.ProfileUpdated) -> None:
+        for tab_id in self.tabs():
+            tab = self.nametowidget(tab_id)
+            if tab.path == event.path:
+                tab.show_profile(event.line_stats)
+
+    def _on_run_button_pressed(self, event: events.RunButtonPressed) -> None:
         self.save()
 
         selected_tab = self.get_selected_tab()
@@ -148,4 +155,4 @@ class Editor(ttk.Notebook):
             message_error("Cannot run tab without assigned path")
             return
 
-        events.RunRequested(self.get_selected_tab().path)
+        events.RunRequested(self.get_selected_tab().path, event.fast_forward)
@@ -16,12 +16,25 @@ from ttkbootstrap.widgets.scrolled import ScrolledText
 
 from common import PYSCRIPT_EXTENSION
 from errors import EditorTabCreationError
+from incremental_lexer import IncrementalLexer
+from program_profile import LineStats
 
 logger = logging.getLogger(__name__)
 
 
+def _blend_colors(color: str, other_color: str, ratio: float) -> str:
+    """Mix two "#rrggbb" colors, from only color at ratio 0 to only other_color at ratio 1."""
+    channels = (
+        round(int(color[i:i + 2], 16) * (1 - ratio) + int(other_color[i:i + 2], 16) * ratio)
+        for i in (1, 3, 5)
+    )
+    return "#" + "".join(f"{channel:02x}" for channel in channels)
+
+
 class EditorTab(ttk.Frame):
     DELTA_PER_ZOOM = 120
+    HEAT_LEVELS = 8
+    LEX_DELAY_MS = 150 # typing faster than this re-lexes once, after the last key
 
     path: Path | None
     font: str
@@ -31,6 +44,9 @@ class EditorTab(ttk.Frame):
     line_text_width: int
     padx_ratio: float
     zoom_factor: float
+    lexer: IncrementalLexer
+    lex_after_id: str | None
+    line_heats: dict[int, int] # line -> heat level, from 1 to HEAT_LEVELS
 
     line_text: tk.Text
     scrolled_text: ScrolledText
@@ -66,6 +82,9 @@ class EditorTab(ttk.Frame):
         self.line_text_width = line_text_width
         self.padx_ratio = padx_ratio
         self.zoom_factor = zoom_factor
+        self.lexer = IncrementalLexer()
+        self.lex_after_id = None
+        self.line_heats = {}
 
         self.line_text = tk.Text(self)
         self.line_text.config(
@@ -79,6 +98,12 @@ class EditorTab(ttk.Frame):
             fg=style.colors.secondary,
         )
         self.line_text.tag_config("active_line", foreground=style.colors.info)
+        self.line_text.tag_config("error_line", foreground=style.colors.danger)
+        for heat in range(1, self.HEAT_LEVELS + 1):
+            self.line_text.tag_config(
+                f"heat_{heat}",
+                background=_blend_colors(style.colors.primary, style.colors.danger, heat / self.HEAT_LEVELS),
+            )
         self.line_text.pack(side=ttkc.LEFT, fill=ttkc.Y)
 
         self.scrolled_text = ScrolledText(
@@ -99,7 +124,7 @@ class EditorTab(ttk.Frame):
             yscrollcommand=self._on_text_scroll,
         )
 
-        self.text.bind("<<Modified>>", self._on_change)
+        self.text.bind("<<Modified>>", self._on_modified)
         self.text.bind("<Configure>", self._on_change)
         self.text.bind("<KeyRelease>", self._on_change)
         self.text.bind("<ButtonRelease-1>", self._on_change)
@@ -133,6 +158,12 @@ class EditorTab(ttk.Frame):
                     logger.debug(f"No default content file found at '{default_content_path}'")
                 logger.debug("Keeping empty tab")
 
+    def destroy(self) -> None:
+        if self.lex_after_id is not None:
+            self.after_cancel(self.lex_after_id)
+            self.lex_after_id = None
+        super().destroy()
+
     def _try_load(self, path: Path) -> None:
         logger.debug(f"Loading text from '{path}'")
         try:
@@ -164,6 +195,16 @@ class EditorTab(ttk.Frame):
             padx=self.font_size * self.padx_ratio,
         )
 
+    def show_profile(self, line_stats: dict[int, LineStats]) -> None:
+        """Color the line numbers by how much of the program's time each line took, or clear them when empty."""
+        max_time = max((stats.time for stats in line_stats.values()), default=0.0)
+        self.line_heats = {
+            line: ceil(stats.time / max_time * self.HEAT_LEVELS)
+            for line, stats in line_stats.items()
+            if line > 0 and stats.time > 0
+        }
+        self._update_line_numbers()
+
     def _on_text_scroll(self, *args) -> None:
         self.scrolled_text.vbar.set(*args)
         self.line_text.yview_moveto(args[0])
@@ -172,8 +213,24 @@ class EditorTab(ttk.Frame):
         self.text.yview(*args)
         self.line_text.yview(*args)
 
-    def _on_change(self, _event: tk.Event) -> None:
+    def _on_modified(self, _event: tk.Event) -> None:
+        if not self.text.edit_modified():
+            # clearing the flag below fires <<Modified>> too
+            return
         self.text.edit_modified(False)
+        # getting and diffing the whole text is O(file size), so it waits for a pause in the typing
+        if self.lex_after_id is not None:
+            self.after_cancel(self.lex_after_id)
+        self.lex_after_id = self.after(self.LEX_DELAY_MS, self._lex)
+        self._update_line_numbers()
+
+    def _lex(self) -> None:
+        self.lex_after_id = None
+        self.lexer.update(self.text.get("1.0", "end-1c"))
+        self._update_line_numbers()
+
+    def _on_change(self, _event: tk.Event) -> None:
+        # moving the cursor or resizing doesn't change the text, only the line numbers may need redrawing
         self._update_line_numbers()
 
     def _on_focus_change(self, _event: tk.Event) -> None:
@@ -204,5 +261,11 @@ class EditorTab(ttk.Frame):
                 f"{current_line}.end",
             )
 
+        for line, _message in self.lexer.get_diagnostics():
+            self.line_text.tag_add("error_line", f"{line}.0", f"{line}.end")
+
+        for line, heat in self.line_heats.items():
+            self.line_text.tag_add(f"heat_{heat}", f"{line}.0", f"{line}.end")
+
         self.line_text.config(state=ttkc.DISABLED)
         self.line_text.yview_moveto(first)
@@ -7,7 +7,7 @@ Contributors:
 """
 
 from __future__ import annotations
-from enum import auto, Enum
+from enum import auto, Enum, IntEnum
 import logging
 from pathlib import Path
 from PIL import Image
@@ -91,18 +91,19 @@ class TileAction(Enum):
 
 
 class TileType(Enum):
-    BLOCKED = ("X", None,                                None,                       False, 2)
-    EMPTY   = ("O", Path("sprites/tile_background.png"), None,                       True,  2)
-    PLAYER  = ("P", Path("sprites/tile_background.png"), Path("sprites/player.png"), True,  0)
-    FLAG    = ("F", Path("sprites/tile_background.png"), Path("sprites/flag.png"),   True,  2)
-    KEY     = ("K", Path("sprites/tile_background.png"), Path("sprites/key.png"),    True,  2)
-    GATE    = ("G", Path("sprites/tile_background.png"), Path("sprites/gate.png"),   False, 2)
-    ENEMY   = ("E", Path("sprites/tile_background.png"), Path("sprites/enemy.png"),  False, 1)
-    WIN     = ("W", Path("sprites/tile_background.png"), Path("sprites/win.png"),    False, 2)
+    BLOCKED = ("X", None,                                None,                       False, False, 2)
+    EMPTY   = ("O", Path("sprites/tile_background.png"), None,                       True,  False, 2)
+    PLAYER  = ("P", Path("sprites/tile_background.png"), Path("sprites/player.png"), True,  True,  0)
+    FLAG    = ("F", Path("sprites/tile_background.png"), Path("sprites/flag.png"),   True,  False, 2)
+    KEY     = ("K", Path("sprites/tile_background.png"), Path("sprites/key.png"),    True,  False, 2)
+    GATE    = ("G", Path("sprites/tile_background.png"), Path("sprites/gate.png"),   False, False, 2)
+    ENEMY   = ("E", Path("sprites/tile_background.png"), Path("sprites/enemy.png"),  False, True,  1)
+    WIN     = ("W", Path("sprites/tile_background.png"), Path("sprites/win.png"),    False, False, 2)
 
     character: str
     image: PILImage | None
     is_walkable: bool
+    is_actor: bool # whether tiles of the type can pick actions
 
     def __new__(
         cls,
@@ -110,6 +111,7 @@ class TileType(Enum):
         background_path: Path | None,
         foreground_path: Path | None,
         is_walkable: bool,
+        is_actor: bool,
         action_priority: int,
     ) -> TileType:
         bg = Image.open(background_path).convert("RGBA") if background_path else None
@@ -127,6 +129,7 @@ class TileType(Enum):
         obj.character = character
         obj.image = composed
         obj.is_walkable = is_walkable
+        obj.is_actor = is_actor
         obj.action_priority = action_priority
 
         return obj
@@ -181,6 +184,68 @@ class NodeType(Enum):
     LITERAL   = auto()
     CALL      = auto()
     OPERATION = auto()
+    RETURN    = auto()
+    EXIT      = auto()
+    LOOP      = auto()
+
+
+class Opcode(IntEnum):
+    """Instructions of a compiled Program, each followed by operand_count ints in its code.
+
+    Binary operators come last, so the Processor can recognize them with one comparison.
+    """
+    NOP           = (0, 0)
+    PUSH_CONST    = (1, 1) # constant index
+    LOAD          = (2, 1) # slot index
+    STORE         = (3, 1) # slot index
+    POP           = (4, 0)
+    CALL          = (5, 2) # function index, argument count
+    ACT           = (6, 1) # TileAction index; suspends the Processor
+    RETURN        = (7, 0)
+    EXIT          = (8, 0)
+    HALT          = (9, 0)
+    NEGATE        = (10, 0)
+    JUMP          = (11, 1) # target offset
+    JUMP_IF_FALSE = (12, 1) # target offset; pops the condition
+    # superinstructions, made by the Optimizer out of common sequences
+    LOAD_CONST_OP = (13, 3) # slot index, constant index, binary opcode
+    LOAD_LOAD_OP  = (14, 3) # slot index, slot index, binary opcode
+    CONST_STORE   = (15, 2) # constant index, slot index
+    # binary operators
+    ADD           = (32, 0)
+    SUBTRACT      = (33, 0)
+    MULTIPLY      = (34, 0)
+    DIVIDE        = (35, 0)
+    FLOOR_DIVIDE  = (36, 0)
+    MODULO        = (37, 0)
+    POWER         = (38, 0)
+    EQUAL         = (39, 0)
+    NOT_EQUAL     = (40, 0)
+    LESS          = (41, 0)
+    LESS_EQUAL    = (42, 0)
+    GREATER       = (43, 0)
+    GREATER_EQUAL = (44, 0)
+
+    operand_count: int
+
+    def __new__(cls, value: int, operand_count: int) -> Opcode:
+        obj = int.__new__(cls, value)
+        obj._value_ = value
+
+        obj.operand_count = operand_count
+
+        return obj
+
+
+class OperandKind(Enum):
+    """What an operand of an Opcode refers to, for reading and writing pyscript assembly."""
+    CONSTANT = auto() # index into Program.constants, written as a literal
+    SLOT     = auto() # index into Program.slot_names, written as the name
+    FUNCTION = auto() # index into Program.function_names, written as the name
+    COUNT    = auto() # a plain number, like a call's argument count
+    ACTION   = auto() # index into TILE_ACTIONS, written as the action's name
+    LABEL    = auto() # code offset, written as a label
+    OPERATOR = auto() # a binary Opcode, written as its name
 
 
 def _test() -> None:
@@ -189,6 +254,8 @@ def _test() -> None:
         TileAction,
         TileType,
         TokenType,
+        Opcode,
+        OperandKind,
     ):
         print()
         print_enum(enum)
@@ -24,3 +24,28 @@ class UnknownTileTypeError(ValueError):
 class UnknownTokenError(ValueError):
     """Raised when the Parser finds a token that is broken or doesn't exist."""
     pass
+
+
+class PyscriptRuntimeError(RuntimeError):
+    """Raised when a pyscript program fails while a Processor runs it."""
+    pass
+
+
+class NonTerminatingProgramError(PyscriptRuntimeError):
+    """Raised when a pyscript program keeps running out of fuel without doing anything."""
+    pass
+
+
+class LinkError(ValueError):
+    """Raised when a pyscript program calls a function that doesn't exist, or with the wrong number of arguments."""
+    pass
+
+
+class BytecodeFileError(ValueError):
+    """Raised when a bytecode file is broken or made by an incompatible version."""
+    pass
+
+
+class VerificationError(ValueError):
+    """Raised when a compiled Program could misbehave if run, like jumping out of its code or popping an empty stack."""
+    pass
@@ -15,6 +15,7 @@ from pathlib import Path
 from typing import Callable, ClassVar
 
 from level import Level
+from program_profile import LineStats
 from pyscript_token import Token
 from tile_data import TileData
 
@@ -136,6 +137,12 @@ class LevelSelectOpened(Event):
     pass
 
 
+@dataclass(frozen=True, slots=True)
+class ProfileUpdated(Event):
+    path: Path
+    line_stats: dict[int, LineStats] # empty when profiling was turned off
+
+
 @dataclass(frozen=True, slots=True)
 class RedoRequested(Event):
     pass
@@ -148,12 +155,18 @@ class RestartRequested(Event):
 
 @dataclass(frozen=True, slots=True)
 class RunButtonPressed(Event):
-    pass
+    fast_forward: bool = False
 
 
 @dataclass(frozen=True, slots=True)
 class RunRequested(Event):
     path: Path
+    fast_forward: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class SeekRequested(Event):
+    step: int
 
 
 @dataclass(frozen=True, slots=True)
@@ -173,11 +186,22 @@ class TileDataChanged(Event):
     tile_data: TileData
 
 
+@dataclass(frozen=True, slots=True)
+class TimelineChanged(Event):
+    step: int
+    length: int # steps stored, so the latest step that can be sought to
+
+
 @dataclass(frozen=True, slots=True)
 class ToggleFullscreenRequested(Event):
     pass
 
 
+@dataclass(frozen=True, slots=True)
+class ToggleProfilingRequested(Event):
+    pass
+
+
 @dataclass(frozen=True, slots=True)
 class TokenizingFinished(Event):
     tokens: list[Token]
@@ -5,43 +5,121 @@ Contributors:
     Romcode
 """
 
+from io import BytesIO
+import logging
 from pathlib import Path
+from typing import Callable
 
+from common import message_error
 from cycle_controller import CycleController
+from errors import LinkError, PyscriptRuntimeError, UnknownTokenError
 import events
 from level_model import LevelModel
-from parser import FunctionHolder, Parser
+from linker import link
+from parser import Function, FunctionHolder, hello_world, Parser
+from program_cache import CacheEntry, ProgramCache
+from program_profile import ProgramProfile
 from scheduler import Scheduler
 
+logger = logging.getLogger(__name__)
+
+FAST_FORWARD_FRAME_TIME = 0.02 # seconds of stepping between redraws when fast-forwarding
+
 
 class GameController:
     cycle_controller: CycleController
     level_model: LevelModel
+    program_cache: ProgramCache
+    function_holder: FunctionHolder
+    is_profiling: bool # whether programs loaded from now on are profiled
+    profile: ProgramProfile | None
+    profile_path: Path | None # source of the profiled program
 
     def __init__(self, scheduler: Scheduler, path: Path) -> None:
         self.cycle_controller = CycleController(scheduler)
         self.level_model = LevelModel.from_path(path)
+        self.program_cache = ProgramCache()
+        self.function_holder = FunctionHolder()
+        self.function_holder.add(Function(print, object))
+        self.function_holder.add(Function(hello_world))
+        self.function_holder.add(Function(hello_world), "hello")
+        self.is_profiling = False
+        self.profile = None
+        self.profile_path = None
 
         events.Cycled.connect(self._on_cycled)
         events.LevelComplete.connect(self._on_level_complete)
         events.RestartRequested.connect(self._on_restart_requested)
         events.RunRequested.connect(self._on_run_requested)
+        events.SeekRequested.connect(self._on_seek_requested)
         events.StepBackRequested.connect(self._on_step_back_requested)
         events.StepForwardRequested.connect(self._on_step_forward_requested)
+        events.ToggleProfilingRequested.connect(self._on_toggle_profiling_requested)
 
     def destroy(self) -> None:
         events.Cycled.disconnect(self._on_cycled)
         events.RestartRequested.disconnect(self._on_restart_requested)
         events.RunRequested.disconnect(self._on_run_requested)
+        events.SeekRequested.disconnect(self._on_seek_requested)
         events.StepBackRequested.disconnect(self._on_step_back_requested)
         events.StepForwardRequested.disconnect(self._on_step_forward_requested)
+        events.ToggleProfilingRequested.disconnect(self._on_toggle_profiling_requested)
+
+    def load_program(self, path: Path) -> CacheEntry:
+        """Tokenize, parse and compile a file, or reuse the results if the file was seen before."""
+        source = path.read_bytes()
+        key = self.program_cache.make_key(source)
+        entry = self.program_cache.get(key)
+        if entry is not None:
+            logger.info("Reusing cached program for '%s'", path)
+            return entry
+
+        parser = Parser(FunctionHolder(), path)
+        tokens = parser.tokenize_buffer(BytesIO(source))
+        process_tree = parser.parse(tokens)
+        entry = CacheEntry(tokens, process_tree, parser.compile(process_tree))
+        self.program_cache.put(key, entry)
+        return entry
+
+    def step_forward(self) -> None:
+        """Step the level, stopping the cycles if a program fails."""
+        self._advance(self.level_model.step_forward)
+
+    def fast_forward(self) -> None:
+        """Run as many steps as fit in a frame, stopping the cycles once the level is over."""
+        self._advance(lambda: self.level_model.fast_forward(FAST_FORWARD_FRAME_TIME))
+        if self.cycle_controller.is_running and self.level_model.is_over():
+            self.cycle_controller.stop()
+
+    def _advance(self, step: Callable[[], None]) -> None:
+        try:
+            step()
+        except PyscriptRuntimeError as e:
+            if self.cycle_controller.is_running:
+                self.cycle_controller.stop()
+            self._log_processor_stats()
+            message_error("Program failed:\n%s", e)
+        finally:
+            self._update_profile()
+
+    def _update_profile(self) -> None:
+        if self.profile is not None:
+            events.ProfileUpdated(self.profile_path, self.profile.get_line_stats())
+
+    def _log_processor_stats(self) -> None:
+        for x, y, stats in self.level_model.get_processor_stats():
+            logger.info("Processor at (%d, %d): %s", x, y, stats)
 
     def _on_cycled(self, _event: events.Cycled) -> None:
-        self.level_model.step_forward()
+        if self.cycle_controller.is_fast_forward:
+            self.fast_forward()
+        else:
+            self.step_forward()
 
     def _on_level_complete(self, _event: events.LevelComplete) -> None:
         if self.cycle_controller.is_running:
             self.cycle_controller.stop()
+        self._log_processor_stats()
 
     def _on_restart_requested(self, _event: events.RestartRequested) -> None:
         if self.cycle_controller.is_running:
@@ -52,10 +130,24 @@ class GameController:
         if self.cycle_controller.is_running:
             self.cycle_controller.stop()
         else:
-            parser = Parser(FunctionHolder(), event.path)
-            parser.tokenize()
-            # TODO: generate processors and pass them to level model tiles
-            self.cycle_controller.start()
+            try:
+                entry = self.load_program(event.path)
+                builtins = link(entry.program, self.function_holder)
+            except (LinkError, OSError, SyntaxError, UnknownTokenError) as e:
+                message_error("Failed to run '%s':\n%s", event.path, e)
+                return
+            events.TokenizingFinished(list(entry.tokens))
+            if self.level_model.get_step_count() == 0:
+                # only a level at its start gets new processors, otherwise the running ones resume
+                self.profile = ProgramProfile(entry.program) if self.is_profiling else None
+                self.profile_path = event.path
+                self.level_model.load_program(entry.program, builtins, self.profile)
+            self.cycle_controller.start(event.fast_forward)
+
+    def _on_seek_requested(self, event: events.SeekRequested) -> None:
+        if self.cycle_controller.is_running:
+            self.cycle_controller.stop()
+        self.level_model.seek(event.step)
 
     def _on_step_back_requested(self, _event: events.StepBackRequested) -> None:
         if self.cycle_controller.is_running:
@@ -65,4 +157,12 @@ class GameController:
     def _on_step_forward_requested(self, _event: events.StepForwardRequested) -> None:
         if self.cycle_controller.is_running:
             self.cycle_controller.stop()
-        self.level_model.step_forward()
+        self.step_forward()
+
+    def _on_toggle_profiling_requested(self, _event: events.ToggleProfilingRequested) -> None:
+        # takes effect on the next run from the level's start
+        self.is_profiling = not self.is_profiling
+        logger.info("Profiling %s", "on" if self.is_profiling else "off")
+        if not self.is_profiling and self.profile is not None:
+            events.ProfileUpdated(self.profile_path, {})
+            self.profile = None
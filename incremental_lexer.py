@@ -0,0 +1,190 @@
+"""IncrementalLexer class that keeps the tokens of an edited text up to date line by line
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from dataclasses import replace
+import logging
+import re
+from typing import NamedTuple
+
+from enums import TokenType
+from parser import ESCAPE_CHAR, QUOTES, TOKEN_PATTERN, make_token
+from pyscript_token import Token
+
+logger = logging.getLogger(__name__)
+
+# Rest of a string literal that was opened on an earlier line, up to and including its closing quote.
+STRING_TAIL_PATTERNS = {
+    quote: re.compile(
+        "(?:[^{0}{1}]|{1}.)*{0}".format(re.escape(quote), re.escape(ESCAPE_CHAR)),
+        re.DOTALL,
+    )
+    for quote in QUOTES
+}
+
+
+class OpenString(NamedTuple):
+    """Lexer state of a line that starts inside a string literal."""
+    quote: str
+    text: str # everything after the opening quote so far
+    column: int # of the opening quote
+
+
+class IncrementalLexer:
+    """Tokens of a text, kept per line so an edit only re-lexes the lines it affects.
+
+    Each line remembers the lexer state it starts in, which is either None
+    or an OpenString when a string literal spans the line break.
+    After an edit, the changed lines are lexed again, then the following ones
+    until a line's start state matches what it was before.
+
+    Stored tokens only know their column, so inserting lines doesn't
+    invalidate the ones below; get_tokens fills in the lines.
+    A string literal spanning several lines belongs to the line it ends on.
+    An error skips the rest of its line and is kept as a diagnostic for that line.
+    """
+    lines: list[str]
+    start_states: list[OpenString | None]
+    line_tokens: list[list[Token]]
+    line_errors: list[str | None]
+    end_state: OpenString | None
+    token_count: int
+
+    def __init__(self, text: str = "") -> None:
+        self.lines = []
+        self.start_states = []
+        self.line_tokens = []
+        self.line_errors = []
+        self.end_state = None
+        self.token_count = 0
+        self.update(text)
+
+    def get_tokens(self) -> list[Token]:
+        """Return the tokens of the whole text, with their line numbers."""
+        tokens = []
+        for index, line_tokens in enumerate(self.line_tokens):
+            for token in line_tokens:
+                line = index + 1
+                if token.type is TokenType.STRING_LIT:
+                    # the string may have started some lines above the one it's stored in
+                    line -= token.value.count("\n")
+                tokens.append(replace(token, line=line))
+        return tokens
+
+    def get_diagnostics(self) -> list[tuple[int, str]]:
+        """Return (line number, message) pairs for every line that failed to lex."""
+        diagnostics = [
+            (index + 1, error)
+            for index, error in enumerate(self.line_errors)
+            if error is not None
+        ]
+        if self.end_state is not None:
+            diagnostics.append((len(self.lines), "Unterminated string literal"))
+        return diagnostics
+
+    def update(self, text: str) -> None:
+        """Replace the whole text, re-lexing only the lines that differ from the previous one."""
+        new_lines = _split_lines(text)
+        old_lines = self.lines
+
+        # strip the unchanged lines at both ends
+        first = 0
+        max_first = min(len(old_lines), len(new_lines))
+        while first < max_first and old_lines[first] == new_lines[first]:
+            first += 1
+        old_last = len(old_lines)
+        new_last = len(new_lines)
+        while old_last > first and new_last > first and old_lines[old_last - 1] == new_lines[new_last - 1]:
+            old_last -= 1
+            new_last -= 1
+
+        if first == old_last and first == new_last:
+            return
+        self.edit(first, old_last, new_lines[first:new_last])
+
+    def edit(self, first: int, last: int, new_lines: list[str]) -> None:
+        """Replace lines[first:last] with new_lines (each keeping its line break) and re-lex."""
+        for tokens in self.line_tokens[first:last]:
+            self.token_count -= len(tokens)
+
+        # the lines before the edit are untouched, so neither is the state they end in
+        if first < len(self.lines):
+            state = self.start_states[first]
+        else:
+            state = self.end_state
+
+        new_count = len(new_lines)
+        self.lines[first:last] = new_lines
+        self.start_states[first:last] = [None] * new_count
+        self.line_tokens[first:last] = [[] for _ in range(new_count)]
+        self.line_errors[first:last] = [None] * new_count
+
+        index = first
+        while index < len(self.lines):
+            if index >= first + new_count and self.start_states[index] == state:
+                # the rest of the text lexes exactly as before
+                logger.debug("Re-lexed lines %d to %d", first + 1, index)
+                return
+            self.start_states[index] = state
+            state = self._lex_line(index)
+            index += 1
+
+        logger.debug("Re-lexed lines %d to %d", first + 1, index)
+        self.end_state = state
+
+    def _lex_line(self, index: int) -> OpenString | None:
+        """Lex one line from its start state, store the results and return the state of the next line."""
+        self.token_count -= len(self.line_tokens[index])
+        line = self.lines[index]
+        state = self.start_states[index]
+        tokens = []
+        error = None
+        c = 0
+
+        if state is not None:
+            tail = STRING_TAIL_PATTERNS[state.quote].match(line)
+            if tail is None:
+                self._store_line(index, tokens, error)
+                return OpenString(state.quote, state.text + line, state.column)
+            tokens.append(make_token("STRING", state.quote + state.text + tail.group(), 0, state.column))
+            c = tail.end()
+
+        state = None
+        line_length = len(line)
+        while c < line_length:
+            match = TOKEN_PATTERN.match(line, c)
+            kind = match.lastgroup
+            if kind is None:
+                break
+            text = match.group(kind)
+            if kind == "ERROR" and text in QUOTES:
+                state = OpenString(text, line[match.end():], match.start(kind) + 1)
+                break
+            try:
+                tokens.append(make_token(kind, text, 0, match.start(kind) + 1))
+            except (SyntaxError, ValueError) as e:
+                error = str(e)
+                break
+            c = match.end()
+
+        self._store_line(index, tokens, error)
+        return state
+
+    def _store_line(self, index: int, tokens: list[Token], error: str | None) -> None:
+        self.line_tokens[index] = tokens
+        self.line_errors[index] = error
+        self.token_count += len(tokens)
+
+
+def _split_lines(text: str) -> list[str]:
+    """Split text after each "\\n", unlike str.splitlines, which also splits on other characters."""
+    lines = text.split("\n")
+    last = lines.pop()
+    lines = [line + "\n" for line in lines]
+    if last != "":
+        lines.append(last)
+    return lines
@@ -21,20 +21,28 @@ class LevelBottomBar(ttk.Frame):
     run_image_tk: ImageTk.PhotoImage
     pause_image_tk: ImageTk.PhotoImage
     step_forward_image_tk: ImageTk.PhotoImage
+    fast_forward_image_tk: ImageTk.PhotoImage
     level_select_image_tk: ImageTk.PhotoImage
 
     restart_button: ttk.Button
     step_back_button: ttk.Button
     run_button: ttk.Button
     step_forward_button: ttk.Button
+    fast_forward_button: ttk.Button
     level_select_button: ttk.Button
 
+    step_scale: ttk.Scale
+    step_label: ttk.Label
+    step: int
+    step_count: int # steps in the level's timeline
+    is_updating_step_scale: bool
+
     def __init__(self, master: tk.Misc, **kwargs) -> None:
         kwargs.setdefault("bootstyle", ttkc.DARK)
         super().__init__(master, **kwargs)
 
         self.columnconfigure(1, weight=1)
-        self.columnconfigure(5, weight=1)
+        self.columnconfigure(6, weight=1)
         self.rowconfigure(0, minsize=8)
 
         self.restart_image_tk = ImageTk.PhotoImage(Image.open(Path("sprites/restart.png")))
@@ -82,7 +90,18 @@ class LevelBottomBar(ttk.Frame):
             bootstyle=kwargs["bootstyle"],
         )
         self.step_forward_button.grid(column=4, row=1)
-        
+
+        self.fast_forward_image_tk = ImageTk.PhotoImage(Image.open(Path("sprites/fast_forward.png")))
+        self.fast_forward_button = ttk.Button(
+            self,
+            command=lambda: events.RunButtonPressed(fast_forward=True),
+            compound=tk.TOP,
+            text="Fast forward",
+            image=self.fast_forward_image_tk,
+            bootstyle=kwargs["bootstyle"],
+        )
+        self.fast_forward_button.grid(column=5, row=1)
+
         self.level_select_image_tk = ImageTk.PhotoImage(Image.open(Path("sprites/level_select.png")))
         self.level_select_button = ttk.Button(
             self,
@@ -92,17 +111,49 @@ class LevelBottomBar(ttk.Frame):
             image=self.level_select_image_tk,
             bootstyle=kwargs["bootstyle"],
         )
-        self.level_select_button.grid(column=6, row=1)
+        self.level_select_button.grid(column=7, row=1)
+
+        # scrubs through the steps run so far
+        self.step = 0
+        self.step_count = 0
+        self.is_updating_step_scale = False
+        # a scale can't be empty, so it goes up to 1 until there are steps
+        self.step_scale = ttk.Scale(self, from_=0, to=1, command=self._on_step_scale_moved)
+        self.step_scale.grid(column=0, row=2, columnspan=7, sticky=ttkc.EW, padx=8, pady=4)
+        self.step_label = ttk.Label(self, bootstyle=f"inverse-{kwargs['bootstyle']}")
+        self.step_label.grid(column=7, row=2)
+        self._update_step_label()
 
         events.CyclingToggled.connect(self._on_cycling_toggled)
+        events.TimelineChanged.connect(self._on_timeline_changed)
 
     def destroy(self) -> None:
         events.CyclingToggled.disconnect(self._on_cycling_toggled)
+        events.TimelineChanged.disconnect(self._on_timeline_changed)
         super().destroy()
 
+    def _update_step_label(self) -> None:
+        self.step_label.config(text=f"Step {self.step} / {self.step_count}")
+
     def _on_cycling_toggled(self, event: events.CyclingToggled) -> None:
         self.run_button.config(
             text="Pause" if event.is_running else "Run",
             image=self.pause_image_tk if event.is_running else self.run_image_tk
         )
 
+    def _on_timeline_changed(self, event: events.TimelineChanged) -> None:
+        self.step = event.step
+        self.step_count = event.length
+        self.is_updating_step_scale = True
+        self.step_scale.config(to=max(self.step_count, 1))
+        self.step_scale.set(self.step)
+        self.is_updating_step_scale = False
+        self._update_step_label()
+
+    def _on_step_scale_moved(self, value: str) -> None:
+        if self.is_updating_step_scale:
+            return
+        step = min(round(float(value)), self.step_count)
+        if step != self.step:
+            self.step = step
+            events.SeekRequested(step)
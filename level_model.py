@@ -6,160 +6,114 @@ Contributors:
 """
 
 from __future__ import annotations
-from copy import deepcopy
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 import logging
 from pathlib import Path
 
-from enums import Direction, TileAction, TileType
 import events
 from level import Level
 from matrix import Matrix
-from tile_data import TileData
+from parser import Function
+from processor_state import ProcessorStats
+from program import Program
+from program_profile import ProgramProfile
+from simulation import Simulation
 from tile_model import TileModel
+from timeline import Timeline
 
 logger = logging.getLogger(__name__)
 
+MAX_FAST_FORWARD_STEPS = 100_000 # programs that act forever never make the level over
+
 
 @dataclass(frozen=True)
 class LevelModel:
-    level: Level
-    tile_model_matrix: Matrix[TileModel]
-    history: list[Matrix[TileModel]] = field(default_factory=list)
+    """The Simulation of the open level, telling the rest of the app about it through events.
+
+    Tiles the simulation changed are announced with TileDataChanged after
+    each call, followed by a TimelineChanged, and a complete level with LevelComplete.
+    """
+    simulation: Simulation
 
     @classmethod
     def from_path(cls, path: Path) -> LevelModel:
-        level = Level.from_path(path)
-        tile_model_matrix = level.get_tile_data_matrix().map(TileModel)
+        return cls(Simulation(Level.from_path(path)))
 
-        return cls(level, tile_model_matrix)
+    @property
+    def level(self) -> Level:
+        return self.simulation.level
 
-    def check_win_state(self) -> bool:
-        return all(self.tile_model_matrix.map(
-            lambda tile_model: tile_model.tile_data.tile_type != TileType.FLAG
-        ))
+    @property
+    def tile_model_matrix(self) -> Matrix[TileModel]:
+        return self.simulation.tile_model_matrix
 
-    def move_tile(self, x: int, y: int, direction: Direction) -> None:
-        to_x = x + direction.x
-        to_y = y + direction.y
-
-        try:
-            from_tile_model = self.tile_model_matrix.get(x, y)
-            to_tile_model = self.tile_model_matrix.get(to_x, to_y)
-            assert to_tile_model.tile_data.tile_type.is_walkable
-        except (IndexError, AssertionError):
-            return
-
-        logger.debug(
-            "Moving tile %s from (%i, %i) in direction %s (%s)",
-            from_tile_model.tile_data.tile_type,
-            x,
-            y,
-            direction,
-            to_tile_model.tile_data.tile_type,
-        )
-
-        if (
-            from_tile_model.tile_data.tile_type is TileType.PLAYER
-            and to_tile_model.tile_data.tile_type is TileType.FLAG
-        ):
-            self.set_tile_model(to_x, to_y, TileModel(TileData(TileType.WIN)))
-        else:
-            self.set_tile_model(to_x, to_y, from_tile_model)
-
-        self.set_tile_model(x, y, TileModel())
-
-    def process_tile_action(self, x: int, y: int, action: TileAction) -> None:
-        tile_data = self.tile_model_matrix.get(x, y).tile_data
-
-        match action:
-            case TileAction.MOVE_FORWARD:
-                self.move_tile(x, y, tile_data.tile_direction)
-
-            case TileAction.MOVE_BACK:
-                self.move_tile(x, y, -tile_data.tile_direction)
-
-            case TileAction.TURN_LEFT:
-                self.tile_config(x, y, tile_direction=tile_data.tile_direction.rotate())
-
-            case TileAction.TURN_RIGHT:
-                self.tile_config(x, y, tile_direction=tile_data.tile_direction.rotate(True))
-
-            case TileAction.ATTACK:
-                # TODO: Implement attacking.
-                pass
-
-            case _:
-                logger.error("Unknown tile action %s", action)
+    @property
+    def timeline(self) -> Timeline:
+        return self.simulation.timeline
 
-    def restart(self) -> None:
-        if len(self.history) == 0:
-            return
+    def get_step_count(self) -> int:
+        return self.simulation.get_step_count()
 
-        for x, y, tile_model in self.history[0].iter_xy():
-            self.set_tile_model(x, y, deepcopy(tile_model))
+    def check_win_state(self) -> bool:
+        return self.simulation.check_win_state()
 
-        self.history.clear()
+    def is_over(self) -> bool:
+        return self.simulation.is_over()
 
-    def set_tile_model(
+    def load_program(
         self,
-        x: int,
-        y: int,
-        tile_model: TileModel
+        program: Program,
+        builtins: tuple[Function, ...],
+        profile: ProgramProfile | None = None,
     ) -> None:
-        self.tile_model_matrix.set(x, y, tile_model)
+        self.simulation.load_program(program, builtins, profile)
+        self._emit_changes()
 
-        events.TileDataChanged(x, y, tile_model.tile_data)
+    def get_processor_stats(self) -> list[tuple[int, int, ProcessorStats]]:
+        return self.simulation.get_processor_stats()
 
-    def step_back(self) -> None:
-        if len(self.history) == 0:
-            return
+    def restart(self) -> None:
+        self.simulation.restart()
+        self._emit_changes()
+
+    def rewind(self, cycle: int) -> None:
+        self.simulation.rewind(cycle)
+        self._emit_changes()
 
-        for x, y, tile_model in self.history.pop().iter_xy():
-            self.set_tile_model(x, y, deepcopy(tile_model))
+    def seek(self, step: int) -> None:
+        self.simulation.seek(step)
+        self._emit_changes()
+
+    def step_back(self) -> None:
+        self.simulation.step_back()
+        self._emit_changes()
 
     def step_forward(self) -> None:
         # TODO: Add events for base state and win state, to toggle editor and step buttons.
-        # Early check looks redundant but is necessary to avoid stepping when level is already complete.
-        if self.check_win_state():
-            events.LevelComplete(self.level, len(self.history))
-            return
-
-        self.history.append(deepcopy(self.tile_model_matrix))
-
-        tile_data_matrix = self.tile_model_matrix.map(
-            lambda tile_model: tile_model.tile_data
-        )
-        tile_actions = [
-            (x, y, action)
-            for x, y, tile_model in self.tile_model_matrix.iter_xy()
-            if (action := tile_model.get_action(x, y, tile_data_matrix)) is not None
-        ]
-        tile_actions.sort(
-            key=lambda xyaction: tile_data_matrix.get(
-                xyaction[0],
-                xyaction[1],
-            ).tile_type.action_priority
-        )
-
-        for x, y, action in tile_actions:
-            self.process_tile_action(x, y, action)
+        try:
+            self.simulation.step()
+        finally:
+            # a failing program still shows what happened before it failed
+            self._emit_changes()
 
         if self.check_win_state():
-            events.LevelComplete(self.level, len(self.history))
+            events.LevelComplete(self.level, self.simulation.get_step_count())
 
-    def tile_config(
-        self,
-        x: int,
-        y: int,
-        tile_type: TileType | str | None = None,
-        tile_direction: Direction | str  | None = None,
-    ) -> None:
-        tile_data = self.tile_model_matrix.get(x, y).tile_data
+    def fast_forward(self, time_budget: float | None = None, max_steps: int = MAX_FAST_FORWARD_STEPS) -> None:
+        """Step until the level is over, or time_budget seconds are up, and only then announce the changed tiles.
+
+        Each changed tile is announced once, as it ended up, so the view redraws it once
+        however many steps it changed in. The timeline still holds every step.
+        """
+        try:
+            self.simulation.run(max_steps, time_budget)
+        finally:
+            self._emit_changes()
 
-        if tile_type is not None:
-            tile_data.tile_type = TileType.normalize(tile_type)
-        if tile_direction is not None:
-            tile_data.tile_direction = Direction.normalize(tile_direction)
+        if self.check_win_state():
+            events.LevelComplete(self.level, self.simulation.get_step_count())
 
-        events.TileDataChanged(x, y, tile_data)
+    def _emit_changes(self) -> None:
+        for x, y, tile_data in self.simulation.take_changes():
+            events.TileDataChanged(x, y, tile_data)
+        events.TimelineChanged(self.simulation.get_step_count(), len(self.simulation.timeline))
@@ -0,0 +1,44 @@
+"""link function that resolves the functions a compiled Program calls
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+import logging
+
+from enums import Opcode
+from errors import LinkError
+from parser import Function, FunctionHolder
+from program import Program
+
+logger = logging.getLogger(__name__)
+
+
+def link(program: Program, function_holder: FunctionHolder) -> tuple[Function, ...]:
+    """Return the builtin table of a program: its functions, indexed like its CALL instructions.
+
+    Done once before a program runs, so calls are a lookup by index, and
+    unknown functions or wrong argument counts fail before the first cycle
+    instead of in the middle of one. Every Function takes exactly as many
+    arguments as it has arg_types.
+    """
+    missing = [name for name in program.function_names if not function_holder.has(name)]
+    if len(missing) > 0:
+        raise LinkError(f"Unknown function{'s' if len(missing) > 1 else ''}: {', '.join(missing)}")
+    builtins = tuple(function_holder.get(name) for name in program.function_names)
+
+    for offset, opcode, operands in program.iter_instructions():
+        if opcode is not Opcode.CALL:
+            continue
+        function_index, argument_count = operands
+        expected_count = len(builtins[function_index].arg_types)
+        if argument_count != expected_count:
+            raise LinkError(
+                f"'{program.function_names[function_index]}' takes {expected_count} "
+                f"argument{'' if expected_count == 1 else 's'} but is called with {argument_count} (at offset {offset})"
+            )
+
+    logger.debug("Linked %d functions", len(builtins))
+    return builtins
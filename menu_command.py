@@ -60,6 +60,7 @@ class EditMenuCommand(MenuCommandEnum):
 
 class ViewMenuCommand(MenuCommandEnum):
     TOGGLE_FULLSCREEN = ("Toggle fullscreen", events.ToggleFullscreenRequested, "F11", "<F11>")
+    TOGGLE_PROFILING  = ("Toggle profiling", events.ToggleProfilingRequested, "F9", "<F9>")
 
 
 def _test() -> None:
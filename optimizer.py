@@ -0,0 +1,376 @@
+"""Optimizer class that rewrites compiled Programs to run in fewer instructions
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass
+from itertools import accumulate, repeat
+import logging
+from typing import Any, Callable
+
+from enums import Opcode
+from program import add_constant, BINARY_OPERATIONS, make_constant_indices, Program
+
+logger = logging.getLogger(__name__)
+
+# Folding must not make the program much bigger than its source, so results past these limits stay unfolded.
+MAX_FOLDED_INT_BITS = 128
+MAX_FOLDED_SEQUENCE_LENGTH = 4096
+JUMP_OPCODES = (Opcode.JUMP, Opcode.JUMP_IF_FALSE)
+# after these, the next instruction only runs if something jumps to it
+UNCONDITIONAL_OPCODES = (Opcode.JUMP, Opcode.RETURN, Opcode.EXIT, Opcode.HALT)
+
+
+class Instruction:
+    """One instruction of a Program being optimized.
+
+    Jumps point at the Instruction they go to instead of an offset, so passes
+    can add and remove instructions freely. When a jump target is removed,
+    it forwards to the instruction that takes its place. An instruction that
+    absorbs others keeps its own source line.
+    """
+    __slots__ = ("opcode", "operands", "target", "forward", "line")
+    opcode: Opcode
+    operands: list[int]
+    target: Instruction | None
+    forward: Instruction | None
+    line: int
+
+    def __init__(self, opcode: Opcode, *operands: int, target: Instruction | None = None, line: int = 0) -> None:
+        self.opcode = opcode
+        self.operands = list(operands)
+        self.target = target
+        self.forward = None
+        self.line = line
+
+    def get_target(self) -> Instruction:
+        """Return the instruction this jump goes to, following forwards of removed ones."""
+        target = self.target
+        while target.forward is not None:
+            target = target.forward
+        return target
+
+
+@dataclass
+class PassReport:
+    name: str
+    instructions_before: int
+    instructions_after: int
+
+
+# an optimization pass takes the instructions and the constant pool, which it may append to
+Pass = Callable[[list[Instruction], list[Any]], list[Instruction]]
+
+
+class Optimizer:
+    """Runs a pipeline of passes over a Program and reports what each did.
+
+    The default pipeline folds constant expressions, removes code that can't
+    run or has no effect, then fuses common sequences into superinstructions.
+    The instruction counts of every pass are kept in reports, for format_reports.
+
+    Passes only remove and rewrite instructions, never reorder them, so
+    kept_counts maps the last program optimized to the result: for every
+    instruction of it, and its end, how many instructions before it were kept.
+    A straight run of the original code runs kept_counts[end] - kept_counts[start]
+    instructions once optimized, which is how PythonCompiler counts like the result.
+    """
+    passes: tuple[tuple[str, Pass], ...]
+    reports: list[PassReport]
+    kept_counts: array | None
+
+    def __init__(self, passes: tuple[tuple[str, Pass], ...] | None = None) -> None:
+        if passes is None:
+            passes = DEFAULT_PASSES
+        self.passes = passes
+        self.reports = []
+        self.kept_counts = None
+
+    def optimize(self, program: Program) -> Program:
+        instructions = _decode(program)
+        original_instructions = tuple(instructions)
+        constants = list(program.constants)
+        self.reports = []
+        for name, optimization_pass in self.passes:
+            count = len(instructions)
+            instructions = optimization_pass(instructions, constants)
+            self.reports.append(PassReport(name, count, len(instructions)))
+            logger.debug("Pass %s: %d -> %d instructions", name, count, len(instructions))
+
+        kept = set(instructions)
+        self.kept_counts = array("I", accumulate((instruction in kept for instruction in original_instructions), initial=0))
+        return _encode(instructions, constants, program)
+
+    def format_reports(self) -> str:
+        lines = [f"{'pass':<20} {'before':>8} {'after':>8}"]
+        for report in self.reports:
+            lines.append(f"{report.name:<20} {report.instructions_before:>8} {report.instructions_after:>8}")
+        return "\n".join(lines)
+
+
+def fold_constants(instructions: list[Instruction], constants: list[Any]) -> list[Instruction]:
+    """Compute operations on constants ahead of time.
+
+    Operations that would fail, or make huge results, are left to fail or run at run time.
+    """
+    targets = _get_targets(instructions)
+    constant_indices = make_constant_indices(constants)
+    result: list[Instruction] = []
+    for instruction in instructions:
+        opcode = instruction.opcode
+        if (
+            opcode >= Opcode.ADD
+            and len(result) >= 2
+            and result[-1].opcode is Opcode.PUSH_CONST
+            and result[-2].opcode is Opcode.PUSH_CONST
+            and instruction not in targets
+            and result[-1] not in targets
+        ):
+            folded = _fold_binary(
+                opcode,
+                constants[result[-2].operands[0]],
+                constants[result[-1].operands[0]],
+            )
+            if folded is not None:
+                # the first PUSH_CONST takes the result, so jumps to it still work
+                _forward(result.pop(), result[-1])
+                _forward(instruction, result[-1])
+                result[-1].operands[0] = add_constant(constants, constant_indices, folded[0])
+                continue
+
+        elif (
+            opcode is Opcode.NEGATE
+            and len(result) >= 1
+            and result[-1].opcode is Opcode.PUSH_CONST
+            and instruction not in targets
+        ):
+            try:
+                negated = -constants[result[-1].operands[0]]
+            except TypeError:
+                pass
+            else:
+                _forward(instruction, result[-1])
+                result[-1].operands[0] = add_constant(constants, constant_indices, negated)
+                continue
+
+        result.append(instruction)
+    return result
+
+
+def eliminate_dead_code(instructions: list[Instruction], constants: list[Any]) -> list[Instruction]:
+    """Remove instructions that can't run or do nothing.
+
+    That's code after an exit, return or jump that nothing jumps to,
+    values pushed only to be popped, and conditions known ahead of time.
+    """
+    targets = _get_targets(instructions)
+    result: list[Instruction] = []
+    is_reachable = True
+    for index, instruction in enumerate(instructions):
+        if instruction in targets:
+            is_reachable = True
+        if not is_reachable:
+            _forward(instruction, _get_next(instructions, index))
+            continue
+
+        opcode = instruction.opcode
+        previous = result[-1] if len(result) > 0 else None
+        if (
+            previous is not None
+            and previous.opcode in (Opcode.PUSH_CONST, Opcode.LOAD)
+            and instruction not in targets
+            and (
+                opcode is Opcode.POP
+                or opcode is Opcode.JUMP_IF_FALSE and previous.opcode is Opcode.PUSH_CONST
+            )
+        ):
+            result.pop()
+            if opcode is Opcode.JUMP_IF_FALSE and not constants[previous.operands[0]]:
+                # the condition is always false: always jump
+                instruction.opcode = Opcode.JUMP
+                _forward(previous, instruction)
+                result.append(instruction)
+                is_reachable = False
+            else:
+                next_instruction = _get_next(instructions, index)
+                _forward(previous, next_instruction)
+                _forward(instruction, next_instruction)
+            continue
+
+        result.append(instruction)
+        if opcode in UNCONDITIONAL_OPCODES:
+            is_reachable = False
+    return result
+
+
+def make_superinstructions(instructions: list[Instruction], constants: list[Any]) -> list[Instruction]:
+    """Fuse common sequences into single instructions, so the Processor dispatches fewer of them.
+
+    LOAD, PUSH_CONST, binary operator becomes LOAD_CONST_OP,
+    LOAD, LOAD, binary operator becomes LOAD_LOAD_OP
+    and PUSH_CONST, STORE becomes CONST_STORE.
+    """
+    targets = _get_targets(instructions)
+    result: list[Instruction] = []
+    for instruction in instructions:
+        opcode = instruction.opcode
+        if (
+            opcode >= Opcode.ADD
+            and len(result) >= 2
+            and result[-2].opcode is Opcode.LOAD
+            and result[-1].opcode in (Opcode.PUSH_CONST, Opcode.LOAD)
+            and instruction not in targets
+            and result[-1] not in targets
+        ):
+            second = result.pop()
+            first = result[-1]
+            if second.opcode is Opcode.PUSH_CONST:
+                first.opcode = Opcode.LOAD_CONST_OP
+            else:
+                first.opcode = Opcode.LOAD_LOAD_OP
+            first.operands = [first.operands[0], second.operands[0], opcode]
+            _forward(second, first)
+            _forward(instruction, first)
+            continue
+
+        if (
+            opcode is Opcode.STORE
+            and len(result) >= 1
+            and result[-1].opcode is Opcode.PUSH_CONST
+            and instruction not in targets
+        ):
+            first = result[-1]
+            first.opcode = Opcode.CONST_STORE
+            first.operands = [first.operands[0], instruction.operands[0]]
+            _forward(instruction, first)
+            continue
+
+        result.append(instruction)
+    return result
+
+
+DEFAULT_PASSES: tuple[tuple[str, Pass], ...] = (
+    ("fold constants", fold_constants),
+    ("eliminate dead code", eliminate_dead_code),
+    ("superinstructions", make_superinstructions),
+)
+
+
+def _fold_binary(opcode: Opcode, left: Any, right: Any) -> tuple[Any] | None:
+    """Return the result of a binary operation in a tuple, or None if it shouldn't be folded."""
+    if (
+        opcode is Opcode.POWER
+        and isinstance(left, int)
+        and isinstance(right, int)
+        and right > 0
+        and left.bit_length() * right > MAX_FOLDED_INT_BITS
+    ):
+        return None
+    if opcode is Opcode.MULTIPLY:
+        for sequence, count in ((left, right), (right, left)):
+            if isinstance(sequence, str) and isinstance(count, int) and len(sequence) * count > MAX_FOLDED_SEQUENCE_LENGTH:
+                return None
+
+    try:
+        value = BINARY_OPERATIONS[opcode - Opcode.ADD](left, right)
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+
+    if isinstance(value, int) and value.bit_length() > MAX_FOLDED_INT_BITS:
+        return None
+    if isinstance(value, str) and len(value) > MAX_FOLDED_SEQUENCE_LENGTH:
+        return None
+    return (value,)
+
+
+def _forward(removed: Instruction, replacement: Instruction) -> None:
+    if removed is not replacement:
+        removed.forward = replacement
+
+
+def _get_next(instructions: list[Instruction], index: int) -> Instruction:
+    # the compiler always ends programs with HALT, so the last instruction is never removed
+    return instructions[min(index + 1, len(instructions) - 1)]
+
+
+def _get_targets(instructions: list[Instruction]) -> set[Instruction]:
+    return {
+        instruction.get_target()
+        for instruction in instructions
+        if instruction.target is not None
+    }
+
+
+def _decode(program: Program) -> list[Instruction]:
+    instructions = []
+    by_offset: dict[int, Instruction] = {}
+    lines = program.lines
+    for offset, opcode, operands in program.iter_instructions():
+        instruction = Instruction(opcode, *operands, line=0 if lines is None else lines[offset])
+        instructions.append(instruction)
+        by_offset[offset] = instruction
+    for instruction in instructions:
+        if instruction.opcode in JUMP_OPCODES:
+            instruction.target = by_offset[instruction.operands[0]]
+    return instructions
+
+
+def _encode(instructions: list[Instruction], constants: list[Any], program: Program) -> Program:
+    """Lay the instructions out again, keeping only the constants still in use."""
+    offsets: dict[Instruction, int] = {}
+    offset = 0
+    for instruction in instructions:
+        offsets[instruction] = offset
+        offset += 1 + len(instruction.operands)
+
+    used_constants: dict[int, int] = {}
+    def get_constant_index(index: int) -> int:
+        return used_constants.setdefault(index, len(used_constants))
+
+    code = array("i")
+    lines = array("I")
+    for instruction in instructions:
+        operands = list(instruction.operands)
+        match instruction.opcode:
+            case Opcode.JUMP | Opcode.JUMP_IF_FALSE:
+                operands[0] = offsets[instruction.get_target()]
+            case Opcode.PUSH_CONST | Opcode.CONST_STORE:
+                operands[0] = get_constant_index(operands[0])
+            case Opcode.LOAD_CONST_OP:
+                operands[1] = get_constant_index(operands[1])
+        code.append(instruction.opcode)
+        code.extend(operands)
+        lines.extend(repeat(instruction.line, 1 + len(operands)))
+
+    return Program(
+        code,
+        tuple(constants[index] for index in used_constants),
+        program.slot_names,
+        program.function_names,
+        program.python_program,
+        lines=None if program.lines is None else lines,
+    )
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from pathlib import Path
+
+    from parser import FunctionHolder, Parser
+
+    argument_parser = ArgumentParser(description="Compile a pyscript file and show what the optimizer does to it.")
+    argument_parser.add_argument("path", type=Path, nargs="?", default=Path("pyscript/test.pyscript"))
+    argument_parser.add_argument("--dump", action="store_true", help="also print the optimized program")
+    arguments = argument_parser.parse_args()
+
+    parser = Parser(FunctionHolder(), arguments.path)
+    program = parser.compile(parser.parse(parser.tokenize_buffer()), optimize=False)
+    optimizer = Optimizer()
+    optimized = optimizer.optimize(program)
+    print(optimizer.format_reports())
+    if arguments.dump:
+        print(optimized.disassemble())
@@ -8,24 +8,35 @@ Contributors:
 # TODO: Please refactor into one file per class.
 
 from __future__ import annotations
-from dataclasses import dataclass
+from codecs import getincrementaldecoder
+from dataclasses import dataclass, replace
+from itertools import chain
 import logging
+from mmap import mmap
+import re
 from string import ascii_letters, digits, whitespace
 from pathlib import Path
-from typing import Callable, Type, Any
+from typing import Callable, IO, Iterator, NoReturn, Sequence, Type, Any
 
-from enums import TileAction, TokenType, NodeType
-from errors import UnknownTokenError
+from compiler import Compiler
+from enums import TokenType, NodeType
+from errors import UnknownTokenError, VerificationError
 import events
-from matrix import Matrix
+from optimizer import Optimizer
+from program import Program
 from pyscript_token import Token
-from tile_data import TileData
+from python_compiler import PythonCompiler
+from token_buffer import TokenBuffer, TokenCursor
+from verifier import verify
 
 if __name__ == "__main__":
     # debug only stuff; shouldn't be imported when actually running the project
     from parser_debug_tools import make_process_tree
 
 logger = logging.getLogger(__name__)
+# Bump whenever tokens, process trees or compiled programs change shape, so cached ones get dropped.
+PARSER_VERSION = 13
+CHUNK_SIZE = 1 << 16 # characters read at a time by Parser.iter_tokens
 REFERENCE_CHARS = ascii_letters + digits + "_"
 REFERENCE_START_CHARS = ascii_letters + "_"
 SINGLE_COMMENT = "#"
@@ -36,6 +47,7 @@ KEYWORDS = (
     "var",
     "return",
     "exit",
+    "while",
     )
 OPERATORS = (
     '**',
@@ -52,7 +64,31 @@ OPERATORS = (
     '<',
     '>',
     )
-operator_initial_characters = {op[0] for op in OPERATORS}
+# higher binds tighter; unary "-" sits between the products and "**", so -2 ** 2 is -(2 ** 2)
+BINARY_OPERATOR_PRECEDENCES = {
+    '==': 1, '!=': 1, '<': 1, '<=': 1, '>': 1, '>=': 1,
+    '+':  2, '-':  2,
+    '*':  3, '/':  3, '//': 3, '%': 3,
+    '**': 5,
+    }
+UNARY_MINUS_PRECEDENCE = 4
+RIGHT_ASSOCIATIVE_OPERATORS = ('**',)
+GROUP_MARKER = None # operator stack entry of a parenthesis that isn't a call
+LITERAL_TOKEN_TYPES = (
+    TokenType.INT_LIT,
+    TokenType.FLOAT_LIT,
+    TokenType.STRING_LIT,
+    )
+# tokens that can't continue an expression, only start a statement, so strings in front of one are a docstring
+STATEMENT_START_TYPES = (
+    None, # the end of the file
+    TokenType.KEYWORD,
+    TokenType.REFERENCE,
+    TokenType.INDENT,
+    TokenType.OPEN_PAREN,
+    TokenType.INT_LIT,
+    TokenType.FLOAT_LIT,
+    )
 TOKEN_PAIRS = {
     TokenType.OPEN_PAREN: TokenType.CLOSE_PAREN,
     TokenType.INDENT:     TokenType.DEINDENT,
@@ -67,6 +103,88 @@ SINGLE_CHAR_TOKENS = {
     ",": TokenType.COMMA,
     }
 
+# Whitespace and comments are swallowed in front of every lexeme, so each match is one token.
+# The alternatives are tried in order; operators are sorted longest first,
+# so "**" wins over "*" and "==" over "=". Anything else ends up in ERROR.
+TOKEN_PATTERN = re.compile(
+    "(?:[{}]+|{}[^\n]*)*".format(re.escape(whitespace), re.escape(SINGLE_COMMENT))
+    + "(?:{})".format("|".join((
+        "(?P<REFERENCE>[{}][{}]*)".format(
+            re.escape(REFERENCE_START_CHARS),
+            re.escape(REFERENCE_CHARS),
+        ),
+        "(?P<BAD_NUMBER>[{0}]+(?:\\.[{0}]*)?e(?![+-]?[{0}])[+-]?)".format(digits),
+        "(?P<NUMBER>[{0}]+(?:\\.[{0}]*)?(?:e[+-]?[{0}]+)?)".format(digits),
+        "(?P<STRING>{})".format("|".join(
+            "{0}(?:[^{0}{1}]|{1}.)*{0}".format(re.escape(quote), re.escape(ESCAPE_CHAR))
+            for quote in QUOTES
+        )),
+        "(?P<OPERATOR>{})".format("|".join(
+            re.escape(op) for op in sorted(OPERATORS, key=len, reverse=True)
+        )),
+        "(?P<SINGLE_CHAR>[{}])".format(re.escape("".join(SINGLE_CHAR_TOKENS))),
+        "\\Z",
+        "(?P<ERROR>.)",
+    ))),
+    re.DOTALL,
+)
+
+
+def make_token(
+    kind: str,
+    text: str,
+    line: int = 0,
+    column: int = 0,
+    path: Path | None = None,
+) -> Token:
+    """Build the token for one TOKEN_PATTERN match, or raise if it's malformed.
+
+    A line or column of 0 means it's unknown.
+    """
+    match kind:
+        case "REFERENCE":
+            if text in KEYWORDS:
+                return Token(TokenType.KEYWORD, text, line, column)
+            return Token(TokenType.REFERENCE, text, line, column)
+
+        case "NUMBER":
+            if "." in text or "e" in text:
+                return Token(TokenType.FLOAT_LIT, float(text), line, column)
+            return Token(TokenType.INT_LIT, int(text), line, column)
+
+        case "STRING":
+            # escapes are kept as written, only the quotes are stripped
+            return Token(TokenType.STRING_LIT, text[1:-1], line, column)
+
+        case "OPERATOR":
+            return Token(TokenType.OPERATOR, text, line, column)
+
+        case "SINGLE_CHAR":
+            return Token(SINGLE_CHAR_TOKENS[text], None, line, column)
+
+        case "BAD_NUMBER":
+            raise SyntaxError(f"Invalid float literal '{text}'{describe_location(line, column, path)}")
+
+        case _:
+            if text in QUOTES:
+                raise SyntaxError(f"Unterminated string literal{describe_location(line, column, path)}")
+            raise UnknownTokenError(f"There are no tokens that start with {repr(text)}{describe_location(line, column, path)}")
+
+
+def describe_location(line: int = 0, column: int = 0, path: Path | None = None) -> str:
+    """Format the known parts of a source location as " (line 1, column 2 in 'path')" for error messages."""
+    parts = []
+    if line > 0:
+        parts.append(f"line {line}")
+    if column > 0:
+        parts.append(f"column {column}")
+    location = ", ".join(parts)
+    if path is not None:
+        location = f"{location} in '{path}'".strip()
+    if location == "":
+        return ""
+    return f" ({location})"
+
 
 def hello_world() -> None:
     print("Hello World!")
@@ -87,7 +205,7 @@ class Function(object):
             self.arg_types = (arg_types,)
 
     def __call__(self, *args, **kwargs) -> Any:
-        self.func(*args, **kwargs)
+        return self.func(*args, **kwargs)
 
     @property
     def name(self) -> str:
@@ -130,73 +248,70 @@ class FunctionHolder(object):
         return func(*args)
 
 
-@dataclass
-class Instruction(object):
-    function: Callable
-    parameters: list
-
-
-class Processor(object):
-    program: list
-    stack: list
-
-    def __init__(self, program: list):
-        self.program = program
-        self.stack = []
-
-    def advance(
-        self,
-        self_x: int,
-        self_y: int,
-        tile_data_matrix: Matrix[TileData],
-    ) -> TileAction | None:
-        # Keeping possibility for multiple player tiles,
-        # that should all succeed with the same code to force versatility.
-        # One processor per player tile, to keep variables separate.
-        logger.debug(
-            "Advancing processor for tile %s at (%s, %s)",
-            tile_data_matrix.get(self_x, self_y).tile_type,
-            self_x,
-            self_y,
-        )
-
-        # TODO: Advance program based on level state, block at next player action and return it.
-
-        return TileAction.MOVE_FORWARD
-        # TileAction.MOVE_BACK
-        # TileAction.TURN_LEFT
-        # TileAction.TURN_RIGHT
-        # TileAction.ATTACK
-        # None (idle)
-
-
-@dataclass
 class ProcessNode(object):
+    """A node of a ProcessTree.
+
+    Nodes are built in large numbers, so they have no __dict__, and leaves
+    don't have a list of children at all. Only statements know their
+    source line, 0 means it's unknown.
+    """
+    __slots__ = ("_parent", "_type", "_value", "_children", "_line")
     _parent: ProcessNode | None
     _type: NodeType
-    _value: Any=None
-    _children: tuple[ProcessNode, ...] | None=None
+    _value: Any
+    _children: list[ProcessNode] | None
+    _line: int
+
+    def __init__(
+        self,
+        parent: ProcessNode | None,
+        node_type: NodeType,
+        value: Any = None,
+        children: list[ProcessNode] | None = None,
+        line: int = 0,
+    ) -> None:
+        self._parent = parent
+        self._type = node_type
+        self._value = value
+        self._children = children
+        self._line = line
+
+    def __repr__(self) -> str:
+        return f"ProcessNode({self._type}, {self._value!r}, {len(self.get_children())} children)"
 
     def get_type(self) -> NodeType:
         return self._type
 
+    def get_value(self) -> Any:
+        return self._value
+
     def get_parent(self) -> ProcessNode | None:
         return self._parent
 
-    def has_children(self):
-        return self._children is None
+    def get_line(self) -> int:
+        return self._line
+
+    def has_children(self) -> bool:
+        return self._children is not None
 
-    def get_children(self) -> tuple[ProcessNode, ...]:
+    def get_children(self) -> Sequence[ProcessNode]:
+        """Return the children; the sequence is the node's own, so don't modify it."""
         if self._children is None:
-            return tuple()
+            return ()
         else:
             return self._children
 
-    def add_child(self, node: ProcessNode):
+    def add_child(self, node: ProcessNode) -> None:
         if self._children is None:
-            self._children = (node,)
+            self._children = [node]
         else:
-            self._children += (node,)
+            self._children.append(node)
+
+    def set_children(self, nodes: list[ProcessNode]) -> None:
+        """Replace all children at once, taking ownership of the list."""
+        for node in nodes:
+            node._parent = self
+        self._children = nodes if len(nodes) > 0 else None
 
 
 @dataclass
@@ -220,7 +335,6 @@ class Parser(object):
     # functions: FunctionHolder
     # variables: dict
     # constants: dict
-    file: str
     path: Path
 
     def __init__(
@@ -229,204 +343,396 @@ class Parser(object):
         path: Path = Path("pyscript/test.pyscript")
     ):
         # self.functions = fh
-        with open(path, "rt") as file:
-            self.file = file.read()
         self.path = path
 
     def tokenize(self) -> list[Token]:
-        tokens = []
-        current_token = ""
-        token_type = TokenType.NOP
-        logger.info(f"Start tokenizing '{self.path}'")
-        line = 1
-        c = 0
-        def add_token(token_type: TokenType, value: Any=None, offset: int=1) -> None:
-            nonlocal line
-            nonlocal c
-            logger.debug(f"Line {line}: found {token_type._name_}")
-            tokens.append(Token(token_type, value))
-            c += offset
-        # if you have a token (like "=") that starts with the same char as an operator (like "=="),
-        # one of them will claim that character, even if it's not the correct one
-        # solution: put operators first and raise this flag if the check fails
-        # flag is lowered immediately after the operator section
-        skip_operators = False
-        while c < len(self.file):
-            current_token = ""
-            char = self.file[c]
-
-            if char == "\n":
-                # TODO: store line numbers in tokens
-                line += 1
-                c += 1
-
-            elif char in whitespace:
-                #logger.debug(f"Found whitespace at {c}")
-                c += 1
-
-            elif char == SINGLE_COMMENT:
-                i = 1
-                while char != "\n":
-                    i += 1
-                    char = self.file[c+i]
-                c += i+1
-
-            elif char in REFERENCE_START_CHARS:
-                i = 0
-                while char in REFERENCE_CHARS:
-                    # get the rest of the token
-                    current_token += char
-                    i += 1
-                    char = self.file[c + i]
-                if current_token in KEYWORDS:
-                    token_type = TokenType.KEYWORD
-                else:
-                    token_type = TokenType.REFERENCE
-                add_token(token_type, current_token, i)
-
-            elif char in digits:
-                is_int = True
-                i = 0
-                while char in digits:
-                    # get the rest of integer part
-                    current_token += char
-                    i += 1
-                    char = self.file[c + i]
-                if char == ".":
-                    # it's a float, it seems
-                    is_int = False
-                    current_token += char
-                    i+=1
-                    char = self.file[c + i]
-                    while char in digits:
-                        # get the decimal part
-                        current_token += char
-                        i += 1
-                        char = self.file[c + i]
-                if char == "e":
-                    # exponent
-                    is_int = False
-                    current_token += char
-                    i+=1
-                    char = self.file[c + i]
-                    if char in "+-":
-                        current_token += char
-                        i += 1
-                        char = self.file[c + i]
-                    if char in digits:
-                        while char in digits:
-                            # get the exponent
-                            current_token += char
-                            i += 1
-                            char = self.file[c + i]
-                    else:
-                        raise SyntaxError(f"Invalid float literal in line {line}: '{current_token}'")
+        """Split the whole source into a list of tokens."""
+        logger.info("Start tokenizing '%s'", self.path)
+        tokens = list(self.iter_tokens())
+        logger.info("Finished tokenizing '%s' into %d tokens", self.path, len(tokens))
+        events.TokenizingFinished(tokens)
+        return tokens
 
-                if is_int:
-                    add_token(TokenType.INT_LIT, int(current_token), i)
-                else:
-                    add_token(TokenType.FLOAT_LIT, float(current_token), i)
-
-            elif char in QUOTES:
-                start_quote = char
-                for i in range(c+1, len(self.file)-1):
-                    char = self.file[i]
-                    if char == start_quote:
-                        # logger.debug("Found endquote")
-                        # TODO: Rework handling of escape characters
-                        escaped = False
-                        for j in range(i-1, c+1, -1):
-                            if self.file[j] == ESCAPE_CHAR:
-                                escaped = not escaped
-                            else:
-                                break
-                        if escaped:
-                            # logger.debug("Quote escaped")
-                            current_token += char
-                        else:
-                            # logger.debug(f"length of str is {i - c - 1}")
-                            c = i + 1
-                            break
-                    else:
-                        current_token += char
-                # offset already handled
-                add_token(TokenType.STRING_LIT, current_token, 0)
-
-            elif char in operator_initial_characters and not skip_operators:
-                i = 0
-                while current_token + char in OPERATORS:
-                    # get the rest of the token
-                    current_token += char
-                    i += 1
-                    char = self.file[c + i]
-                if current_token not in OPERATORS:
-                    # prevent infinite loop
-                    skip_operators = True
+    def iter_tokens(
+        self,
+        stream: IO | mmap | None = None,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> Iterator[Token]:
+        """Lazily yield the tokens of a source, reading it in chunks.
+
+        The stream can be any text or binary file object, or an mmap (bytes are decoded as UTF-8).
+        By default, the file at self.path is opened.
+        Only the unfinished token and the next chunk are held in memory.
+        """
+        # the same text always makes the same type and value, like in TokenBuffer.extend_lexemes,
+        # so make_token only runs the first time a text is seen
+        known_tokens: dict[str, tuple[TokenType, Any]] = {}
+        for lexemes in self._iter_lexeme_chunks(stream, chunk_size):
+            for kind, text, _start, line, column in lexemes:
+                known_token = known_tokens.get(text)
+                if known_token is None:
+                    token = make_token(kind, text, line, column, self.path)
+                    known_token = known_tokens[text] = (token.type, token.value)
+                yield Token(known_token[0], known_token[1], line, column)
+
+    def tokenize_buffer(
+        self,
+        stream: IO | mmap | None = None,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> TokenBuffer:
+        """Tokenize a source into a compact TokenBuffer, without building Token objects.
+
+        Takes the same arguments as iter_tokens.
+        """
+        logger.info("Start tokenizing '%s' into a buffer", self.path)
+        token_buffer = TokenBuffer()
+        token_buffer.extend_lexemes(
+            chain.from_iterable(self._iter_lexeme_chunks(stream, chunk_size)),
+            lambda kind, text, line, column: make_token(kind, text, line, column, self.path),
+        )
+        logger.info("Finished tokenizing '%s' into %d tokens", self.path, len(token_buffer))
+        return token_buffer
+
+    def _iter_lexeme_chunks(
+        self,
+        stream: IO | mmap | None,
+        chunk_size: int,
+    ) -> Iterator[list[tuple[str, str, int, int, int]]]:
+        """Yield the (TOKEN_PATTERN group, text, start offset, line, column) of every lexeme of a source.
+
+        They come in a list per chunk, so the tokenizers loop over lists
+        instead of resuming a generator for every lexeme.
+        """
+        if stream is None:
+            with open(self.path, "rt") as file:
+                yield from self._iter_lexeme_chunks(file, chunk_size)
+            return
+
+        decoder = None
+        buffer = ""
+        offset = 0 # of buffer[0] in the whole source
+        line = 1
+        line_start = 0 # offset of the first character of the line
+        newlines_checked_up_to = 0 # in buffer
+        is_eof = False
+        finditer = TOKEN_PATTERN.finditer
+        count = str.count
+        find = str.find
+        while not is_eof:
+            # read at least as much as is already buffered, so a huge token isn't rescanned for every chunk
+            chunk = stream.read(max(chunk_size, len(buffer)))
+            is_eof = len(chunk) == 0
+            if isinstance(chunk, bytes):
+                if decoder is None:
+                    decoder = getincrementaldecoder("utf-8")()
+                chunk = decoder.decode(chunk, final=is_eof)
+            buffer += chunk
+
+            buffer_length = len(buffer)
+            lexemes = []
+            append = lexemes.append
+            # lines are only counted again for tokens past this, which is most tokens of a line
+            next_newline = find(buffer, "\n", newlines_checked_up_to)
+            if next_newline < 0:
+                next_newline = buffer_length
+            c = 0
+            for match in finditer(buffer):
+                kind = match.lastgroup
+                end = match.end()
+                if not is_eof and (end == buffer_length or kind == "ERROR" and match.group(kind) in QUOTES):
+                    # the token may continue in the next chunk, like a string only closed there;
+                    # any other ERROR is one bad character, raised right away
+                    break
+                c = end
+                if kind is None:
+                    # only whitespace or a comment left at the end of the file
                     continue
-                add_token(TokenType.OPERATOR, current_token, i)
 
-            elif char in SINGLE_CHAR_TOKENS.keys():
-                add_token(SINGLE_CHAR_TOKENS[char])
+                text = match.group(kind)
+                start = end - len(text)
+                if start > next_newline:
+                    line += count(buffer, "\n", newlines_checked_up_to, start)
+                    line_start = offset + buffer.rfind("\n", newlines_checked_up_to, start) + 1
+                    # newlines inside this token are counted with the next one
+                    newlines_checked_up_to = start
+                    next_newline = find(buffer, "\n", start)
+                    if next_newline < 0:
+                        next_newline = buffer_length
+                append((kind, text, offset + start, line, offset + start - line_start + 1))
+            yield lexemes
+
+            newline_count = buffer.count("\n", newlines_checked_up_to, c)
+            if newline_count > 0:
+                line += newline_count
+                line_start = offset + buffer.rfind("\n", newlines_checked_up_to, c) + 1
+            newlines_checked_up_to = 0
+            offset += c
+            buffer = buffer[c:]
+
+    def parse(self, tokens: TokenBuffer) -> ProcessTree:
+        """Make sense of the tokens.
+
+        Walks the buffer once with a cursor, never modifying it.
+        Grammar, with statements ending at a SEMICOLON:
+            program     = [docstring] statement*
+            statement   = "{" statement* "}" | ";"
+                        | "while" expression "{" statement* "}"
+                        | ("var" | "const") REFERENCE ["=" expression]
+                        | ("return" | "exit") [expression]
+                        | REFERENCE "=" expression | expression
+            expression  = comparisons of sums of products of unary "-" and "**" over
+                          literals, REFERENCE, REFERENCE "(" arguments ")" and "(" expression ")"
+        A docstring is a run of string literals at the very start, like a triple-quoted string,
+        it needs no SEMICOLON and is left out of the tree. When the token after the run
+        could continue an expression, like in '"a" + x;', the last string starts the first statement.
+        """
+        logger.info("Start parsing '%s'", self.path)
+        process_tree = ProcessTree()
+        root = process_tree.get_root()
+        cursor = tokens.cursor()
+
+        docstring_length = 0
+        while cursor.peek_type(docstring_length) is TokenType.STRING_LIT:
+            docstring_length += 1
+        if docstring_length > 0 and cursor.peek_type(docstring_length) not in STATEMENT_START_TYPES:
+            docstring_length -= 1
+        cursor.advance(docstring_length)
+
+        self._parse_statements(cursor, root)
+
+        logger.info("Finished parsing '%s'", self.path)
+        return process_tree
+
+    def _parse_statements(self, cursor: TokenCursor, root: ProcessNode) -> None:
+        """Parse statements until the end of the file, with an explicit stack of open closures.
+
+        Each entry holds the CLOSURE node, its statements so far and, for a loop's
+        body, the LOOP node and its condition. Closures are finished when their '}'
+        comes, so nesting depth never touches the Python stack, like in _parse_expression.
+        """
+        open_closures: list[tuple[ProcessNode, list[ProcessNode], ProcessNode | None, ProcessNode | None]] = [
+            (root, [], None, None)
+        ]
+        while True:
+            closure, statements, loop, condition = open_closures[-1]
+            token_type = cursor.peek_type()
+
+            if token_type is TokenType.DEINDENT and len(open_closures) > 1:
+                cursor.advance()
+                closure.set_children(statements)
+                open_closures.pop()
+                if loop is not None:
+                    loop.set_children([condition, closure])
+                    closure = loop
+                open_closures[-1][1].append(closure)
+
+            elif cursor.at_end():
+                if len(open_closures) > 1:
+                    self._raise_syntax_error(cursor, "Missing '}' at the end of the file")
+                root.set_children(statements)
+                return
+
+            elif token_type is TokenType.SEMICOLON:
+                cursor.advance()
+
+            elif token_type is TokenType.INDENT:
+                line = cursor.peek_line()
+                cursor.advance()
+                open_closures.append((ProcessNode(closure, NodeType.CLOSURE, line=line), [], None, None))
+
+            elif token_type is TokenType.KEYWORD and cursor.peek_value() == "while":
+                # like a closure, the loop needs no SEMICOLON
+                loop = ProcessNode(closure, NodeType.LOOP, line=cursor.peek_line())
+                cursor.advance()
+                condition = self._parse_expression(cursor, loop)
+                if cursor.peek_type() is not TokenType.INDENT:
+                    self._raise_syntax_error(cursor, f"Expected '{{' after the loop condition, found {self._describe_next(cursor)}")
+                line = cursor.peek_line()
+                cursor.advance()
+                open_closures.append((ProcessNode(loop, NodeType.CLOSURE, line=line), [], loop, condition))
 
             else:
-                raise UnknownTokenError(f"There are no tokens that start with {repr(char)} (line {line} in '{self.path}')")
-            skip_operators = False
-        logger.info(f"Finished tokenizing '{self.path}' into {len(tokens)} tokens")
-        events.TokenizingFinished(tokens)
-        return tokens
+                statements.append(self._parse_statement(cursor, closure))
+
+    def _parse_statement(self, cursor: TokenCursor, parent: ProcessNode) -> ProcessNode:
+        """Parse one statement that ends at a SEMICOLON."""
+        token_type = cursor.peek_type()
+        line = cursor.peek_line()
+
+        if token_type is TokenType.KEYWORD:
+            keyword = cursor.peek_value()
+            cursor.advance()
+            if keyword in ("var", "const"):
+                name = self._expect(cursor, TokenType.REFERENCE, f"a name after '{keyword}'")
+                node = ProcessNode(parent, NodeType.DEFINE, (keyword, name))
+                if cursor.peek_type() is TokenType.ASSIGN:
+                    cursor.advance()
+                    node.set_children([self._parse_expression(cursor, node)])
+                elif keyword == "const":
+                    self._raise_syntax_error(cursor, f"Constant '{name}' needs a value")
+            else:
+                node_type = NodeType.RETURN if keyword == "return" else NodeType.EXIT
+                node = ProcessNode(parent, node_type)
+                if cursor.peek_type() is not TokenType.SEMICOLON:
+                    node.set_children([self._parse_expression(cursor, node)])
 
-    def parse(self, tokens: list[Token], is_root: bool=True):
-        """Make sense of the tokens."""
-#         linebreaks = (TokenType.SEMICOLON, TokenType.INDENT, TokenType.DEINDENT)
-#         lines = []
-#         line = []
-#         for token in tokens:
-#             line.append(token)
-#             if token.type in linebreaks:
-#                 lines.append(line)
-#                 line = []
-#         return lines
-        process_tree = ProcessTree()
-        code_stack = [process_tree.get_root()]
-        current_node = code_stack[0]
-
-        while len(tokens) > 0:
-            current_token = tokens.pop(0)
-            match current_token.type:
-                case TokenType.REFERENCE:
-                    if tokens[0].type == TokenType.OPEN_PAREN:
-                        # looks like a function call
-                        tokens.pop(0) # consume the OPEN_PAREN
-                        current_node.add_child(ProcessNode(current_node, NodeType.CALL, current_token.value))
-                        current_node = current_node.get_children()[-1]
-                        code_stack.append(current_node)
-                    else:
-                        raise NotImplementedError(f"Encountered non-function REFERENCE ({current_token}) while parsing {self.path}.\nCurrent ProcessTree: {repr(process_tree)}")
-                
-                case TokenType.CLOSE_PAREN:
-                    if code_stack[-1].get_type() == NodeType.CALL: # TODO: update for other uses of parentheses
-                        # exit function call
-                        code_stack.pop(-1)
-                    else:
-                        raise SyntaxError(f"Encountered incorrect parenthesis ({current_token}) while parsing {self.path}.\nCurrent ProcessTree: {repr(process_tree)}")
+        elif token_type is TokenType.REFERENCE and cursor.peek_type(1) is TokenType.ASSIGN:
+            node = ProcessNode(parent, NodeType.WRITE, cursor.peek_value())
+            cursor.advance(2)
+            node.set_children([self._parse_expression(cursor, node)])
 
-                case TokenType.SEMICOLON:
-                    if code_stack[-1].get_type() == NodeType.CLOSURE: # TODO: update for other uses of semicolon
-                        pass # end of an instruction
-                    else:
-                        raise SyntaxError(f"Encountered SEMICOLON ({current_token}) inside an instruction while parsing {self.path}.\nCurrent ProcessTree: {repr(process_tree)}")
+        else:
+            node = self._parse_expression(cursor, parent)
 
-                case _:
-                    raise NotImplementedError(f"Encountered unimplemented token ({current_token}) while parsing {self.path}.\nCurrent ProcessTree: {repr(process_tree)}")
+        self._expect(cursor, TokenType.SEMICOLON, "';' at the end of the instruction")
+        node._line = line
+        return node
 
+    def _parse_expression(self, cursor: TokenCursor, parent: ProcessNode) -> ProcessNode:
+        """Parse an expression by precedence climbing, with explicit stacks instead of recursion.
 
-    def compile(self):
-        """"Compile" the parsers result into a python-based pseudo-assembly format that can be executed
-        by the Player's processor.
+        Operands are finished nodes. The operator stack holds pending operators as
+        (precedence, operator, arity) and open parentheses as markers:
+        GROUP_MARKER, or the CALL node the parenthesis belongs to. Before an operator
+        is pushed, tighter ones are reduced, so nesting depth never touches the Python stack.
+        """
+        operands: list[ProcessNode] = []
+        operators: list[tuple[int, str, int] | ProcessNode | None] = []
+        # number of operands when each still open parenthesis was opened, to count arguments
+        operand_counts: list[int] = []
+
+        def reduce(min_precedence: int) -> None:
+            """Turn pending operators binding at least as tight as min_precedence into OPERATION nodes."""
+            while operators and type(operators[-1]) is tuple and operators[-1][0] >= min_precedence:
+                _precedence, operator, arity = operators.pop()
+                node = ProcessNode(None, NodeType.OPERATION, operator)
+                node.set_children(operands[-arity:])
+                del operands[-arity:]
+                operands.append(node)
+
+        expects_operand = True
+        while True:
+            token_type = cursor.peek_type()
+            value = cursor.peek_value()
+
+            if expects_operand:
+                if token_type is TokenType.OPERATOR and value == "-":
+                    operators.append((UNARY_MINUS_PRECEDENCE, "-", 1))
+                    cursor.advance()
+
+                elif token_type in LITERAL_TOKEN_TYPES:
+                    operands.append(ProcessNode(None, NodeType.LITERAL, value))
+                    cursor.advance()
+                    expects_operand = False
+
+                elif token_type is TokenType.REFERENCE:
+                    cursor.advance()
+                    if cursor.peek_type() is TokenType.OPEN_PAREN:
+                        # looks like a function call
+                        cursor.advance() # consume the OPEN_PAREN
+                        operators.append(ProcessNode(None, NodeType.CALL, value))
+                        operand_counts.append(len(operands))
+                    else:
+                        operands.append(ProcessNode(None, NodeType.READ, value))
+                        expects_operand = False
+
+                elif token_type is TokenType.OPEN_PAREN:
+                    operators.append(GROUP_MARKER)
+                    operand_counts.append(len(operands))
+                    cursor.advance()
+
+                elif (
+                    token_type is TokenType.CLOSE_PAREN
+                    and operators
+                    and type(operators[-1]) is ProcessNode
+                    and operand_counts[-1] == len(operands)
+                ):
+                    # call without arguments, closed below
+                    expects_operand = False
+
+                elif token_type is None:
+                    self._raise_syntax_error(cursor, "Expected a value, found the end of the file")
+                else:
+                    self._raise_syntax_error(cursor, f"Expected a value, found {cursor.get_token()}")
+                continue
+
+            if token_type is TokenType.OPERATOR and value in BINARY_OPERATOR_PRECEDENCES:
+                precedence = BINARY_OPERATOR_PRECEDENCES[value]
+                # an operator of the same level binds the earlier operand first, unless it's right-associative
+                reduce(precedence + 1 if value in RIGHT_ASSOCIATIVE_OPERATORS else precedence)
+                operators.append((precedence, value, 2))
+                cursor.advance()
+                expects_operand = True
+
+            elif token_type is TokenType.COMMA and operand_counts:
+                reduce(0)
+                if operators[-1] is GROUP_MARKER:
+                    self._raise_syntax_error(cursor, f"Expected ')' to close the parenthesis, found {cursor.get_token()}")
+                cursor.advance()
+                expects_operand = True
+
+            elif token_type is TokenType.CLOSE_PAREN and operand_counts:
+                reduce(0)
+                opener = operators.pop()
+                operand_count = operand_counts.pop()
+                if opener is not GROUP_MARKER:
+                    # the arguments are everything parsed since the call's parenthesis
+                    opener.set_children(operands[operand_count:])
+                    del operands[operand_count:]
+                    operands.append(opener)
+                cursor.advance()
 
-        see /pyscript/test.ass for prototype
+            else:
+                break
+
+        reduce(0)
+        if operand_counts:
+            opener = operators[-1]
+            if opener is GROUP_MARKER:
+                self._raise_syntax_error(cursor, f"Expected ')' to close the parenthesis, found {self._describe_next(cursor)}")
+            self._raise_syntax_error(cursor, f"Expected ')' to close the call to '{opener.get_value()}', found {self._describe_next(cursor)}")
+
+        node = operands[0]
+        node._parent = parent
+        return node
+
+    def _describe_next(self, cursor: TokenCursor) -> str:
+        return "the end of the file" if cursor.at_end() else str(cursor.get_token())
+
+    def _expect(self, cursor: TokenCursor, token_type: TokenType, description: str) -> Any:
+        """Consume a token of the given type and return its value, or raise a SyntaxError."""
+        if cursor.peek_type() is not token_type:
+            self._raise_syntax_error(cursor, f"Expected {description}, found {self._describe_next(cursor)}")
+        value = cursor.peek_value()
+        cursor.advance()
+        return value
+
+    def _raise_syntax_error(self, cursor: TokenCursor, message: str) -> NoReturn:
+        raise SyntaxError(f"{message}{describe_location(*cursor.get_position(), self.path)}")
+
+    def compile(self, tree: ProcessTree, optimize: bool = True, translate: bool = False) -> Program:
+        """Compile the parser's result into bytecode that can be executed by the Player's Processor.
+
+        The bytecode is verified, so Processors run it without checks.
+        With translate on, the program is also translated to Python, which Processors
+        run several times faster, but in a generator whose state can't be copied.
+        The translation counts instructions like the bytecode it comes with, optimized or not.
+        The bytecode stays as the fallback for programs Python can't compile.
         """
-        raise NotImplementedError("NYI; get the parser done first")
+        program = Compiler(self.path).compile(tree)
+        kept_counts = None
+        if optimize:
+            optimizer = Optimizer()
+            program = optimizer.optimize(program)
+            kept_counts = optimizer.kept_counts
+        try:
+            program = verify(program)
+        except VerificationError as e:
+            # a compiler bug, but the checked loop can still run the program safely
+            logger.error("Compiled program of '%s' failed verification: %s", self.path, e)
+        if translate:
+            program = replace(program, python_program=PythonCompiler(self.path).compile(tree, kept_counts))
+        return program
 
 
 if __name__ == "__main__":
@@ -449,7 +755,9 @@ if __name__ == "__main__":
     #fh.run("hello")
 
     parser = Parser(fh)
-    tokenized = parser.tokenize()
-    #print(tokenized)
+    tokenized = parser.tokenize_buffer()
+    #print(list(tokenized))
     parsed = parser.parse(tokenized)
     print(parsed)
+    compiled = parser.compile(parsed)
+    print(compiled.disassemble())
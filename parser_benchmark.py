@@ -0,0 +1,402 @@
+"""Benchmarks for the parser, run this file directly to print the results
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from io import StringIO
+import logging
+from pathlib import Path
+from string import digits, whitespace
+from tempfile import TemporaryDirectory
+from timeit import timeit
+import tracemalloc
+from typing import Any
+
+from enums import TokenType
+from errors import UnknownTokenError
+from parser import (
+    ESCAPE_CHAR,
+    FunctionHolder,
+    KEYWORDS,
+    OPERATORS,
+    Parser,
+    ProcessNode,
+    QUOTES,
+    REFERENCE_CHARS,
+    REFERENCE_START_CHARS,
+    SINGLE_CHAR_TOKENS,
+    SINGLE_COMMENT,
+)
+from processor import Processor
+from pyscript_token import Token
+from python_compiler import PythonCompiler
+
+logger = logging.getLogger(__name__)
+SAMPLE_PATH = Path("pyscript/test.pyscript")
+operator_initial_characters = {op[0] for op in OPERATORS}
+
+
+def _legacy_tokenize(source: str, path: Path = SAMPLE_PATH) -> list[Token]:
+    """The character-by-character tokenizer that Parser.tokenize used to be.
+
+    Kept verbatim as the baseline for bench_tokenize.
+    """
+    tokens = []
+    current_token = ""
+    token_type = TokenType.NOP
+    line = 1
+    c = 0
+    def add_token(token_type: TokenType, value: Any=None, offset: int=1) -> None:
+        nonlocal line
+        nonlocal c
+        logger.debug(f"Line {line}: found {token_type._name_}")
+        tokens.append(Token(token_type, value))
+        c += offset
+    # if you have a token (like "=") that starts with the same char as an operator (like "=="),
+    # one of them will claim that character, even if it's not the correct one
+    # solution: put operators first and raise this flag if the check fails
+    # flag is lowered immediately after the operator section
+    skip_operators = False
+    while c < len(source):
+        current_token = ""
+        char = source[c]
+
+        if char == "\n":
+            # TODO: store line numbers in tokens
+            line += 1
+            c += 1
+
+        elif char in whitespace:
+            #logger.debug(f"Found whitespace at {c}")
+            c += 1
+
+        elif char == SINGLE_COMMENT:
+            i = 1
+            while char != "\n":
+                i += 1
+                char = source[c+i]
+            c += i+1
+
+        elif char in REFERENCE_START_CHARS:
+            i = 0
+            while char in REFERENCE_CHARS:
+                # get the rest of the token
+                current_token += char
+                i += 1
+                char = source[c + i]
+            if current_token in KEYWORDS:
+                token_type = TokenType.KEYWORD
+            else:
+                token_type = TokenType.REFERENCE
+            add_token(token_type, current_token, i)
+
+        elif char in digits:
+            is_int = True
+            i = 0
+            while char in digits:
+                # get the rest of integer part
+                current_token += char
+                i += 1
+                char = source[c + i]
+            if char == ".":
+                # it's a float, it seems
+                is_int = False
+                current_token += char
+                i+=1
+                char = source[c + i]
+                while char in digits:
+                    # get the decimal part
+                    current_token += char
+                    i += 1
+                    char = source[c + i]
+            if char == "e":
+                # exponent
+                is_int = False
+                current_token += char
+                i+=1
+                char = source[c + i]
+                if char in "+-":
+                    current_token += char
+                    i += 1
+                    char = source[c + i]
+                if char in digits:
+                    while char in digits:
+                        # get the exponent
+                        current_token += char
+                        i += 1
+                        char = source[c + i]
+                else:
+                    raise SyntaxError(f"Invalid float literal in line {line}: '{current_token}'")
+
+            if is_int:
+                add_token(TokenType.INT_LIT, int(current_token), i)
+            else:
+                add_token(TokenType.FLOAT_LIT, float(current_token), i)
+
+        elif char in QUOTES:
+            start_quote = char
+            for i in range(c+1, len(source)-1):
+                char = source[i]
+                if char == start_quote:
+                    # logger.debug("Found endquote")
+                    # TODO: Rework handling of escape characters
+                    escaped = False
+                    for j in range(i-1, c+1, -1):
+                        if source[j] == ESCAPE_CHAR:
+                            escaped = not escaped
+                        else:
+                            break
+                    if escaped:
+                        # logger.debug("Quote escaped")
+                        current_token += char
+                    else:
+                        # logger.debug(f"length of str is {i - c - 1}")
+                        c = i + 1
+                        break
+                else:
+                    current_token += char
+            # offset already handled
+            add_token(TokenType.STRING_LIT, current_token, 0)
+
+        elif char in operator_initial_characters and not skip_operators:
+            i = 0
+            while current_token + char in OPERATORS:
+                # get the rest of the token
+                current_token += char
+                i += 1
+                char = source[c + i]
+            if current_token not in OPERATORS:
+                # prevent infinite loop
+                skip_operators = True
+                continue
+            add_token(TokenType.OPERATOR, current_token, i)
+
+        elif char in SINGLE_CHAR_TOKENS.keys():
+            add_token(SINGLE_CHAR_TOKENS[char])
+
+        else:
+            raise UnknownTokenError(f"There are no tokens that start with {repr(char)} (line {line} in '{path}')")
+        skip_operators = False
+    return tokens
+
+
+def _make_source(repeats: int) -> str:
+    return SAMPLE_PATH.read_text(encoding="utf-8") * repeats
+
+
+def _tokenize_source(parser: Parser, source: str) -> list[Token]:
+    return list(parser.iter_tokens(StringIO(source)))
+
+
+def bench_tokenize(repeats: tuple[int, ...] = (10, 100, 1000), number: int = 3) -> None:
+    """Compare Parser.iter_tokens and Parser.tokenize_buffer with the legacy tokenizer on growing inputs."""
+    parser = Parser(FunctionHolder(), SAMPLE_PATH)
+    print("Tokenize (mean of %d runs, speedup over legacy)" % number)
+    print(f"{'lines':>8} {'tokens':>8} {'legacy [s]':>12} {'tokens [s]':>18} {'buffer [s]':>18}")
+    for repeat in repeats:
+        source = _make_source(repeat)
+        tokens = _tokenize_source(parser, source)
+        assert tokens == _legacy_tokenize(source), "Token streams differ"
+        assert list(parser.tokenize_buffer(StringIO(source))) == tokens, "Token streams differ"
+
+        legacy_time = timeit(lambda: _legacy_tokenize(source), number=number) / number
+        tokens_time = timeit(lambda: _tokenize_source(parser, source), number=number) / number
+        buffer_time = timeit(lambda: parser.tokenize_buffer(StringIO(source)), number=number) / number
+        print(
+            f"{source.count(chr(10)):>8} {len(tokens):>8} {legacy_time:>12.5f} "
+            f"{tokens_time:>12.5f} {legacy_time / tokens_time:>4.1f}x "
+            f"{buffer_time:>12.5f} {legacy_time / buffer_time:>4.1f}x"
+        )
+
+
+def bench_stream_memory(repeats: tuple[int, ...] = (100, 1000, 10000)) -> None:
+    """Compare peak memory of Parser.tokenize with consuming Parser.iter_tokens lazily."""
+    print("Peak memory while tokenizing a file")
+    print(f"{'lines':>8} {'tokens':>8} {'list [KiB]':>12} {'stream [KiB]':>12}")
+    with TemporaryDirectory() as directory:
+        path = Path(directory) / "generated.pyscript"
+        parser = Parser(FunctionHolder(), path)
+        for repeat in repeats:
+            path.write_text(_make_source(repeat), encoding="utf-8")
+
+            tracemalloc.start()
+            token_count = len(parser.tokenize())
+            list_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            tracemalloc.start()
+            for _token in parser.iter_tokens():
+                pass
+            stream_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            print(
+                f"{repeat * SAMPLE_PATH.read_text().count(chr(10)):>8} {token_count:>8} "
+                f"{list_peak / 1024:>12.1f} {stream_peak / 1024:>12.1f}"
+            )
+
+
+def bench_token_memory(repeats: int = 1000) -> None:
+    """Compare the memory per token of a list of Tokens with a TokenBuffer."""
+    source = _make_source(repeats)
+    parser = Parser(FunctionHolder(), SAMPLE_PATH)
+
+    tracemalloc.start()
+    tokens = _tokenize_source(parser, source)
+    list_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    token_buffer = parser.tokenize_buffer(StringIO(source))
+    buffer_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert list(token_buffer) == tokens, "Token streams differ"
+    print(f"Memory per token over {len(tokens)} tokens")
+    print(f"{'list[Token]':>12} {len(tokens) and list_size / len(tokens):>8.1f} B")
+    print(f"{'TokenBuffer':>12} {len(tokens) and buffer_size / len(tokens):>8.1f} B")
+
+
+def _make_statements(token_count: int) -> str:
+    """Make a source of about token_count tokens with a mix of definitions, writes and calls."""
+    statements = (
+        "var x = 1 + y * 2;\n", # 9 tokens
+        "x = -x ** 2 // (y - 3);\n", # 14 tokens
+        "print(x, \"text\", f(1.5));\n", # 13 tokens
+    )
+    cycle_length = 9 + 14 + 13
+    return "".join(statements) * max(1, token_count // cycle_length)
+
+
+def bench_parse(token_counts: tuple[int, ...] = (1_000, 10_000, 100_000, 1_000_000)) -> None:
+    """Time Parser.parse on growing inputs; constant time per token means linear scaling."""
+    parser = Parser(FunctionHolder(), SAMPLE_PATH)
+    print("Parse")
+    print(f"{'tokens':>10} {'parse [s]':>12} {'per token [us]':>15}")
+    for token_count in token_counts:
+        token_buffer = parser.tokenize_buffer(StringIO(_make_statements(token_count)))
+        parse_time = timeit(lambda: parser.parse(token_buffer), number=1)
+        print(f"{len(token_buffer):>10} {parse_time:>12.5f} {parse_time / len(token_buffer) * 1e6:>15.2f}")
+
+
+def _make_arithmetic(statement_count: int) -> str:
+    """Make a source of statement_count assignments that only do arithmetic on variables."""
+    return "var x = 1; var y = 2.5;\n" + "x = (-x * 3 + y // 2) % 1000 + 1;\n" * statement_count
+
+
+def bench_run(statement_counts: tuple[int, ...] = (1_000, 10_000, 100_000)) -> None:
+    """Time Parser.compile and Processor.run on growing arithmetic programs,
+    with and without the Optimizer, and translated to Python.
+    """
+    parser = Parser(FunctionHolder(), SAMPLE_PATH)
+    print("Compile and run")
+    print(
+        f"{'ints':>10} {'compile [s]':>12} {'run [s]':>12} {'per instruction [ns]':>21} "
+        f"{'optimized ints':>15} {'run [s]':>12} {'translate [s]':>14} {'run [s]':>12}"
+    )
+    for statement_count in statement_counts:
+        process_tree = parser.parse(parser.tokenize_buffer(StringIO(_make_arithmetic(statement_count))))
+        compile_time = timeit(lambda: parser.compile(process_tree, optimize=False), number=1)
+        program = parser.compile(process_tree, optimize=False)
+        optimized_program = parser.compile(process_tree)
+        instruction_count = sum(1 for _instruction in program.iter_instructions())
+        run_time = timeit(lambda: Processor(program).run(), number=1)
+        optimized_run_time = timeit(lambda: Processor(optimized_program).run(), number=1)
+        translate_time = timeit(lambda: PythonCompiler(SAMPLE_PATH).compile(process_tree), number=1)
+        translated_program = parser.compile(process_tree, translate=True)
+        translated_run_time = timeit(lambda: Processor(translated_program).run(), number=1)
+        print(
+            f"{len(program.code):>10} {compile_time:>12.5f} {run_time:>12.5f} "
+            f"{run_time / instruction_count * 1e9:>21.1f} "
+            f"{len(optimized_program.code):>15} {optimized_run_time:>12.5f} "
+            f"{translate_time:>14.5f} {translated_run_time:>12.5f}"
+        )
+
+
+def bench_advance(player_counts: tuple[int, ...] = (1, 100, 10_000), cycles: int = 100) -> None:
+    """Time Processor.advance for many players running a program with work between actions."""
+    parser = Parser(FunctionHolder(), SAMPLE_PATH)
+    source = "var x = 1;\n" + "x = (x * 3 + 1) % 1000;\nturn_left();\n" * cycles
+    program = parser.compile(parser.parse(parser.tokenize_buffer(StringIO(source))))
+    print("Advance")
+    print(f"{'players':>10} {'cycle [s]':>12} {'per advance [us]':>17}")
+    for player_count in player_counts:
+        processor = Processor(program)
+        states = [processor.make_state() for _ in range(player_count)]
+        run_time = timeit(
+            lambda: [processor.advance(state, 0, 0, None) for state in states],
+            number=cycles,
+        ) / cycles
+        print(f"{player_count:>10} {run_time:>12.5f} {run_time / player_count * 1e6:>17.2f}")
+
+
+def _count_nodes(node: ProcessNode) -> int:
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.get_children())
+    return count
+
+
+def bench_tree_memory(token_count: int = 1_000_000) -> None:
+    """Measure the memory per node of a ProcessTree."""
+    parser = Parser(FunctionHolder(), SAMPLE_PATH)
+    token_buffer = parser.tokenize_buffer(StringIO(_make_statements(token_count)))
+
+    tracemalloc.start()
+    tree = parser.parse(token_buffer)
+    tree_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    node_count = _count_nodes(tree.get_root())
+    print(f"Memory per node over {node_count} nodes")
+    print(f"{'ProcessTree':>12} {tree_size / node_count:>8.1f} B")
+
+
+def _make_nested_expressions(depth: int) -> dict[str, str]:
+    """Make single-statement sources whose expression trees are depth levels deep."""
+    return {
+        "parentheses": "(" * depth + "1" + ")" * depth + ";",
+        "calls": "f(" * depth + ")" * depth + ";",
+        "unary minus": "-" * depth + "1;",
+        "power chain": "2" + " ** 2" * depth + ";",
+        "sum chain": "1" + " + 1" * depth + ";",
+    }
+
+
+def bench_parse_nesting(depths: tuple[int, ...] = (1_000, 10_000, 100_000)) -> None:
+    """Time Parser.parse on deeply nested expressions, far past the recursion limit."""
+    parser = Parser(FunctionHolder(), SAMPLE_PATH)
+    print("Parse nested expressions")
+    print(f"{'shape':>12} {'depth':>8} {'tokens':>8} {'parse [s]':>12} {'per token [us]':>15}")
+    for depth in depths:
+        for shape, source in _make_nested_expressions(depth).items():
+            token_buffer = parser.tokenize_buffer(StringIO(source))
+            parse_time = timeit(lambda: parser.parse(token_buffer), number=1)
+            print(
+                f"{shape:>12} {depth:>8} {len(token_buffer):>8} "
+                f"{parse_time:>12.5f} {parse_time / len(token_buffer) * 1e6:>15.2f}"
+            )
+
+
+if __name__ == "__main__":
+    bench_tokenize()
+    print()
+    bench_stream_memory()
+    print()
+    bench_token_memory()
+    print()
+    bench_parse()
+    print()
+    bench_parse_nesting()
+    print()
+    bench_tree_memory()
+    print()
+    bench_run()
+    print()
+    bench_advance()
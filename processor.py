@@ -0,0 +1,536 @@
+"""Processor class that runs a compiled Program for the tiles given to it
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+import logging
+from time import perf_counter
+from typing import Any, Callable, Sequence, TYPE_CHECKING
+
+from compiler import TILE_ACTIONS
+from enums import Opcode, TileAction
+from errors import NonTerminatingProgramError, PyscriptRuntimeError
+from matrix import Matrix
+from processor_state import ProcessorState
+from program import BINARY_OPERATIONS, EMPTY_PROGRAM, Program
+from program_profile import ProgramProfile
+from tile_data import TileData
+
+if TYPE_CHECKING:
+    from parser import Function
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FUEL = 100_000 # instructions per advance
+DEFAULT_MAX_EMPTY_ADVANCES = 20 # advances in a row that run out of fuel before a program counts as stuck
+# what programs and the builtins they call raise for bad values, turned into PyscriptRuntimeErrors by every loop;
+# broken code in the checked loop fails with IndexErrors too, like popping an empty stack
+RUNTIME_ERROR_TYPES = (ArithmeticError, IndexError, TypeError, ValueError)
+
+# Plain ints for the dispatch loop, which compares them against every opcode it reads.
+_NOP = Opcode.NOP.value
+_PUSH_CONST = Opcode.PUSH_CONST.value
+_LOAD = Opcode.LOAD.value
+_STORE = Opcode.STORE.value
+_POP = Opcode.POP.value
+_CALL = Opcode.CALL.value
+_ACT = Opcode.ACT.value
+_RETURN = Opcode.RETURN.value
+_EXIT = Opcode.EXIT.value
+_HALT = Opcode.HALT.value
+_NEGATE = Opcode.NEGATE.value
+_JUMP = Opcode.JUMP.value
+_JUMP_IF_FALSE = Opcode.JUMP_IF_FALSE.value
+_LOAD_CONST_OP = Opcode.LOAD_CONST_OP.value
+_LOAD_LOAD_OP = Opcode.LOAD_LOAD_OP.value
+_CONST_STORE = Opcode.CONST_STORE.value
+_FIRST_BINARY = Opcode.ADD.value
+
+
+class Processor(object):
+    """Runs a Program for any number of tiles, each with its own ProcessorState.
+
+    Keeping possibility for multiple player tiles, that should all succeed
+    with the same code to force versatility. The program and everything
+    derived from it exists once per Processor, and a tile only adds a state
+    from make_state, so tiles keep their variables separate.
+    builtins is the program's table from link, so calls go by index.
+
+    Every advance may run at most fuel instructions, so a cycle takes
+    bounded time whatever the program does. An advance that runs out of fuel
+    idles; after max_empty_advances of those in a row, the program is
+    stopped as non-terminating.
+
+    Programs that passed verify run in a loop without any checks, on a stack
+    made big enough once per advance. Other programs run in a loop that
+    turns broken code into PyscriptRuntimeErrors.
+
+    Programs translated to Python run as a generator instead, with the same
+    fuel, counting instructions as the bytecode they come with would.
+    A runtime error ends such a program for good.
+
+    Given a profile, the Processor runs the bytecode, even of translated
+    programs, in a loop of its own that counts and times every instruction
+    into it. The other loops don't know about profiling at all.
+
+    Nothing in a Processor changes after it's made, except its profile, so copies share it.
+    """
+    program: Program
+    builtins: tuple[Callable, ...] # indexed like the program's CALL instructions
+    python_builtins: list[Callable] # indexed like the translated program's calls
+    fuel: int
+    max_empty_advances: int
+    profile: ProgramProfile | None
+
+    def __init__(
+        self,
+        program: Program = EMPTY_PROGRAM,
+        builtins: Sequence[Function] = (),
+        fuel: int = DEFAULT_FUEL,
+        max_empty_advances: int = DEFAULT_MAX_EMPTY_ADVANCES,
+        profile: ProgramProfile | None = None,
+    ):
+        if len(builtins) != len(program.function_names):
+            raise ValueError(f"Program calls {len(program.function_names)} functions but got {len(builtins)} builtins")
+        if profile is not None and profile.program is not program:
+            raise ValueError("Profile is of another program")
+        self.program = program
+        # the callables themselves, so a call skips Function.__call__
+        self.builtins = tuple(function.func for function in builtins)
+        self.python_builtins = []
+        if program.python_program is not None:
+            builtins_by_name = dict(zip(program.function_names, self.builtins))
+            self.python_builtins = [builtins_by_name[name] for name in program.python_program.function_names]
+        self.fuel = fuel
+        self.max_empty_advances = max_empty_advances
+        self.profile = profile
+
+    def __copy__(self) -> Processor:
+        return self
+
+    def __deepcopy__(self, _memo: dict[int, Any]) -> Processor:
+        return self
+
+    def make_state(self) -> ProcessorState:
+        """Return the state of a tile that's about to start the program."""
+        state = ProcessorState(len(self.program.slot_names))
+        if self.program.python_program is not None and self.profile is None:
+            state.generator = self.program.python_program.start(self.python_builtins, state.limit)
+        return state
+
+    def run(self, state: ProcessorState | None = None, max_instructions: int | None = None) -> Any:
+        """Run the program until it halts and return the value it returned or exited with.
+
+        Actions are skipped, so this is for programs that don't drive a tile.
+        Like advance, raises NonTerminatingProgramError when the fuel runs out
+        max_empty_advances times in a row without an action, and, given
+        max_instructions, also once the program ran that many without halting,
+        as a program that acts forever never runs out of fuel that way.
+        """
+        if state is None:
+            state = self.make_state()
+        empty_step_count = 0
+        while not state.is_halted:
+            action = self._step(state)
+            if action is not None:
+                empty_step_count = 0
+            elif not state.is_halted:
+                empty_step_count += 1
+                if empty_step_count >= self.max_empty_advances:
+                    state.is_halted = True
+                    state.is_non_terminating = True
+                    raise NonTerminatingProgramError(
+                        f"Program used up its {self.fuel} instructions {empty_step_count} times in a row "
+                        f"without an action, it seems to never end (at offset {state.pc})"
+                    )
+            if max_instructions is not None and not state.is_halted and state.instruction_count >= max_instructions:
+                state.is_halted = True
+                state.is_non_terminating = True
+                raise NonTerminatingProgramError(
+                    f"Program ran {state.instruction_count} instructions without halting (at offset {state.pc})"
+                )
+        return state.result
+
+    def advance(
+        self,
+        state: ProcessorState,
+        self_x: int,
+        self_y: int,
+        tile_data_matrix: Matrix[TileData],
+    ) -> TileAction | None:
+        """Run the program up to a tile's next action and return it, or None (idle) once it halted.
+
+        The program picks up where the previous call for the same state left it.
+        Also idles when the fuel runs out before an action, and raises
+        NonTerminatingProgramError when that happened max_empty_advances times in a row.
+        """
+        if state.is_halted:
+            return None
+        logger.debug("Advancing processor for tile at (%s, %s) from offset %d", self_x, self_y, state.pc)
+        state.advance_count += 1
+        action = self._step(state)
+
+        if action is not None:
+            state.action_count += 1
+            state.empty_advance_count = 0
+        elif not state.is_halted:
+            state.empty_advance_count += 1
+            logger.debug("Processor ran out of fuel at offset %d", state.pc)
+            if state.empty_advance_count >= self.max_empty_advances:
+                state.is_halted = True
+                state.is_non_terminating = True
+                raise NonTerminatingProgramError(
+                    f"Program used up its {self.fuel} instructions in each of {state.empty_advance_count} "
+                    f"cycles in a row without an action, it seems to never end (at offset {state.pc})"
+                )
+        return action
+
+    def _step(self, state: ProcessorState) -> TileAction | None:
+        state.cached_snapshot = None
+        if state.generator is not None:
+            return self._resume(state)
+        if self.profile is not None:
+            return self._execute_profiled(state)
+        if self.program.max_stack_depth is not None:
+            return self._execute_unchecked(state)
+        return self._execute(state)
+
+    def _resume(self, state: ProcessorState) -> TileAction | None:
+        """The _execute of programs translated to Python."""
+        state.limit[0] = state.instruction_count + self.fuel
+        try:
+            action_index, state.instruction_count = next(state.generator)
+        except StopIteration as stop:
+            state.result, state.instruction_count = stop.value
+            state.is_halted = True
+            logger.debug("Program halted with %r", state.result)
+            return None
+        except Exception as e:
+            # a generator can't go on after an exception
+            state.is_halted = True
+            if isinstance(e, RUNTIME_ERROR_TYPES):
+                raise PyscriptRuntimeError(f"{type(e).__name__}: {e} (in translated program)") from e
+            raise
+        if action_index is None:
+            return None
+        return TILE_ACTIONS[action_index]
+
+    def _execute(self, state: ProcessorState) -> TileAction | None:
+        """Run instructions until an action, which is returned, the end of the program or the end of the fuel.
+
+        Loops can only go around through a backward JUMP, so that's the only place
+        the fuel is checked; straight code in between is at most the whole program.
+        Instructions are counted from instruction_indices whenever control moves,
+        which costs nothing on the instructions in between.
+
+        This is the checked loop, for programs that weren't verified.
+        """
+        code = self.program.code
+        indices = self.program.instruction_indices
+        constants = self.program.constants
+        slots = state.slots
+        stack = state.stack
+        push = stack.append
+        pop = stack.pop
+        binary_operations = BINARY_OPERATIONS
+        builtins = self.builtins
+        fuel = self.fuel
+        pc = state.pc
+        run_start = pc # offset where the current straight run of instructions began
+        executed = 0 # instructions run before run_start, the rest are added when the run ends
+
+        try:
+            # ordered roughly by how often each instruction runs
+            while True:
+                opcode = code[pc]
+                if opcode >= _FIRST_BINARY:
+                    right = pop()
+                    stack[-1] = binary_operations[opcode - _FIRST_BINARY](stack[-1], right)
+                    pc += 1
+                elif opcode == _LOAD_CONST_OP:
+                    push(binary_operations[code[pc + 3] - _FIRST_BINARY](slots[code[pc + 1]], constants[code[pc + 2]]))
+                    pc += 4
+                elif opcode == _PUSH_CONST:
+                    push(constants[code[pc + 1]])
+                    pc += 2
+                elif opcode == _LOAD:
+                    push(slots[code[pc + 1]])
+                    pc += 2
+                elif opcode == _STORE:
+                    slots[code[pc + 1]] = pop()
+                    pc += 2
+                elif opcode == _LOAD_LOAD_OP:
+                    push(binary_operations[code[pc + 3] - _FIRST_BINARY](slots[code[pc + 1]], slots[code[pc + 2]]))
+                    pc += 4
+                elif opcode == _CONST_STORE:
+                    slots[code[pc + 2]] = constants[code[pc + 1]]
+                    pc += 3
+                elif opcode == _POP:
+                    pop()
+                    pc += 1
+                elif opcode == _JUMP_IF_FALSE:
+                    if pop():
+                        pc += 2
+                    else:
+                        executed += indices[pc] - indices[run_start] + 1
+                        pc = run_start = code[pc + 1]
+                elif opcode == _JUMP:
+                    executed += indices[pc] - indices[run_start] + 1
+                    pc = run_start = code[pc + 1]
+                    if executed >= fuel:
+                        return None
+                elif opcode == _CALL:
+                    argument_count = code[pc + 2]
+                    arguments = stack[len(stack) - argument_count:]
+                    del stack[len(stack) - argument_count:]
+                    push(builtins[code[pc + 1]](*arguments))
+                    pc += 3
+                elif opcode == _ACT:
+                    executed += indices[pc] - indices[run_start] + 1
+                    # actions have no value, and the program resumes right after this one
+                    push(None)
+                    pc += 2
+                    return TILE_ACTIONS[code[pc - 1]]
+                elif opcode == _NEGATE:
+                    stack[-1] = -stack[-1]
+                    pc += 1
+                elif opcode == _NOP:
+                    pc += 1
+                elif opcode == _RETURN or opcode == _EXIT or opcode == _HALT:
+                    executed += indices[pc] - indices[run_start] + 1
+                    state.result = None if opcode == _HALT else pop()
+                    state.is_halted = True
+                    logger.debug("Program halted at offset %d with %r", pc, state.result)
+                    return None
+                else:
+                    raise PyscriptRuntimeError(f"Unknown opcode {opcode} (at offset {pc})")
+        except Exception as e:
+            # the failed instruction counts too
+            executed += indices[pc] - indices[run_start] + 1
+            if isinstance(e, RUNTIME_ERROR_TYPES):
+                raise PyscriptRuntimeError(f"{type(e).__name__}: {e} (at offset {pc})") from e
+            raise
+        finally:
+            state.pc = pc
+            state.instruction_count += executed
+
+    def _execute_unchecked(self, state: ProcessorState) -> TileAction | None:
+        """_execute for verified programs.
+
+        The stack is filled up to the program's max_stack_depth on entry,
+        and values are written at a stack pointer instead of appended and popped.
+        The unused part is cut off again on exit, so the state looks the same
+        to everything else.
+        """
+        code = self.program.code
+        indices = self.program.instruction_indices
+        constants = self.program.constants
+        slots = state.slots
+        stack = state.stack
+        sp = len(stack) # index of the first free place on the stack
+        stack.extend([None] * (self.program.max_stack_depth - sp))
+        binary_operations = BINARY_OPERATIONS
+        builtins = self.builtins
+        fuel = self.fuel
+        pc = state.pc
+        run_start = pc # offset where the current straight run of instructions began
+        executed = 0 # instructions run before run_start, the rest are added when the run ends
+
+        try:
+            # ordered roughly by how often each instruction runs
+            while True:
+                opcode = code[pc]
+                if opcode >= _FIRST_BINARY:
+                    sp -= 1
+                    stack[sp - 1] = binary_operations[opcode - _FIRST_BINARY](stack[sp - 1], stack[sp])
+                    pc += 1
+                elif opcode == _LOAD_CONST_OP:
+                    stack[sp] = binary_operations[code[pc + 3] - _FIRST_BINARY](slots[code[pc + 1]], constants[code[pc + 2]])
+                    sp += 1
+                    pc += 4
+                elif opcode == _PUSH_CONST:
+                    stack[sp] = constants[code[pc + 1]]
+                    sp += 1
+                    pc += 2
+                elif opcode == _LOAD:
+                    stack[sp] = slots[code[pc + 1]]
+                    sp += 1
+                    pc += 2
+                elif opcode == _STORE:
+                    sp -= 1
+                    slots[code[pc + 1]] = stack[sp]
+                    pc += 2
+                elif opcode == _LOAD_LOAD_OP:
+                    stack[sp] = binary_operations[code[pc + 3] - _FIRST_BINARY](slots[code[pc + 1]], slots[code[pc + 2]])
+                    sp += 1
+                    pc += 4
+                elif opcode == _CONST_STORE:
+                    slots[code[pc + 2]] = constants[code[pc + 1]]
+                    pc += 3
+                elif opcode == _POP:
+                    sp -= 1
+                    pc += 1
+                elif opcode == _JUMP_IF_FALSE:
+                    sp -= 1
+                    if stack[sp]:
+                        pc += 2
+                    else:
+                        executed += indices[pc] - indices[run_start] + 1
+                        pc = run_start = code[pc + 1]
+                elif opcode == _JUMP:
+                    executed += indices[pc] - indices[run_start] + 1
+                    pc = run_start = code[pc + 1]
+                    if executed >= fuel:
+                        return None
+                elif opcode == _CALL:
+                    argument_count = code[pc + 2]
+                    arguments = stack[sp - argument_count:sp]
+                    sp -= argument_count
+                    stack[sp] = builtins[code[pc + 1]](*arguments)
+                    sp += 1
+                    pc += 3
+                elif opcode == _ACT:
+                    executed += indices[pc] - indices[run_start] + 1
+                    # actions have no value, and the program resumes right after this one
+                    stack[sp] = None
+                    sp += 1
+                    pc += 2
+                    return TILE_ACTIONS[code[pc - 1]]
+                elif opcode == _NEGATE:
+                    stack[sp - 1] = -stack[sp - 1]
+                    pc += 1
+                elif opcode == _NOP:
+                    pc += 1
+                else:
+                    # RETURN, EXIT and HALT all end the program
+                    executed += indices[pc] - indices[run_start] + 1
+                    if opcode == _HALT:
+                        state.result = None
+                    else:
+                        sp -= 1
+                        state.result = stack[sp]
+                    state.is_halted = True
+                    logger.debug("Program halted at offset %d with %r", pc, state.result)
+                    return None
+        except Exception as e:
+            # the failed instruction counts too
+            executed += indices[pc] - indices[run_start] + 1
+            if isinstance(e, RUNTIME_ERROR_TYPES):
+                raise PyscriptRuntimeError(f"{type(e).__name__}: {e} (at offset {pc})") from e
+            raise
+        finally:
+            del stack[sp:]
+            state.pc = pc
+            state.instruction_count += executed
+
+    def _execute_profiled(self, state: ProcessorState) -> TileAction | None:
+        """_execute that also counts and times every instruction in the profile.
+
+        Each instruction is timed from its start to the start of the next one,
+        or the end of the advance, so nothing is missed between them.
+        """
+        code = self.program.code
+        indices = self.program.instruction_indices
+        constants = self.program.constants
+        slots = state.slots
+        stack = state.stack
+        push = stack.append
+        pop = stack.pop
+        binary_operations = BINARY_OPERATIONS
+        builtins = self.builtins
+        fuel = self.fuel
+        pc = state.pc
+        run_start = pc # offset where the current straight run of instructions began
+        executed = 0 # instructions run before run_start, the rest are added when the run ends
+        clock = perf_counter
+        counts = self.profile.counts
+        times = self.profile.times
+        previous = pc # the instruction that's being timed
+        started = clock()
+
+        try:
+            # ordered roughly by how often each instruction runs
+            while True:
+                now = clock()
+                times[previous] += now - started
+                counts[pc] += 1
+                previous = pc
+                started = now
+                opcode = code[pc]
+                if opcode >= _FIRST_BINARY:
+                    right = pop()
+                    stack[-1] = binary_operations[opcode - _FIRST_BINARY](stack[-1], right)
+                    pc += 1
+                elif opcode == _LOAD_CONST_OP:
+                    push(binary_operations[code[pc + 3] - _FIRST_BINARY](slots[code[pc + 1]], constants[code[pc + 2]]))
+                    pc += 4
+                elif opcode == _PUSH_CONST:
+                    push(constants[code[pc + 1]])
+                    pc += 2
+                elif opcode == _LOAD:
+                    push(slots[code[pc + 1]])
+                    pc += 2
+                elif opcode == _STORE:
+                    slots[code[pc + 1]] = pop()
+                    pc += 2
+                elif opcode == _LOAD_LOAD_OP:
+                    push(binary_operations[code[pc + 3] - _FIRST_BINARY](slots[code[pc + 1]], slots[code[pc + 2]]))
+                    pc += 4
+                elif opcode == _CONST_STORE:
+                    slots[code[pc + 2]] = constants[code[pc + 1]]
+                    pc += 3
+                elif opcode == _POP:
+                    pop()
+                    pc += 1
+                elif opcode == _JUMP_IF_FALSE:
+                    if pop():
+                        pc += 2
+                    else:
+                        executed += indices[pc] - indices[run_start] + 1
+                        pc = run_start = code[pc + 1]
+                elif opcode == _JUMP:
+                    executed += indices[pc] - indices[run_start] + 1
+                    pc = run_start = code[pc + 1]
+                    if executed >= fuel:
+                        return None
+                elif opcode == _CALL:
+                    argument_count = code[pc + 2]
+                    arguments = stack[len(stack) - argument_count:]
+                    del stack[len(stack) - argument_count:]
+                    push(builtins[code[pc + 1]](*arguments))
+                    pc += 3
+                elif opcode == _ACT:
+                    executed += indices[pc] - indices[run_start] + 1
+                    # actions have no value, and the program resumes right after this one
+                    push(None)
+                    pc += 2
+                    return TILE_ACTIONS[code[pc - 1]]
+                elif opcode == _NEGATE:
+                    stack[-1] = -stack[-1]
+                    pc += 1
+                elif opcode == _NOP:
+                    pc += 1
+                elif opcode == _RETURN or opcode == _EXIT or opcode == _HALT:
+                    executed += indices[pc] - indices[run_start] + 1
+                    state.result = None if opcode == _HALT else pop()
+                    state.is_halted = True
+                    logger.debug("Program halted at offset %d with %r", pc, state.result)
+                    return None
+                else:
+                    raise PyscriptRuntimeError(f"Unknown opcode {opcode} (at offset {pc})")
+        except Exception as e:
+            # the failed instruction counts too
+            executed += indices[pc] - indices[run_start] + 1
+            if isinstance(e, RUNTIME_ERROR_TYPES):
+                raise PyscriptRuntimeError(f"{type(e).__name__}: {e} (at offset {pc})") from e
+            raise
+        finally:
+            times[previous] += clock() - started
+            state.pc = pc
+            state.instruction_count += executed
+
+
+IDLE_PROCESSOR = Processor() # shared by player tiles that have no program yet
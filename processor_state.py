@@ -0,0 +1,145 @@
+"""ProcessorState class that holds where one tile is in running a Program
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any
+
+from python_compiler import PythonGenerator
+
+
+@dataclass(frozen=True)
+class ProcessorStats:
+    """Counters of a Processor, for reporting how a program ran."""
+    instruction_count: int
+    advance_count: int
+    action_count: int
+    empty_advance_count: int # in a row, up to now
+    is_halted: bool
+    is_non_terminating: bool
+
+
+@dataclass(frozen=True, slots=True)
+class ProcessorSnapshot:
+    """A ProcessorState as it was at one moment, which nothing can change."""
+    pc: int
+    stack: tuple[Any, ...]
+    slots: tuple[Any, ...]
+    is_halted: bool
+    result: Any
+    instruction_count: int
+    advance_count: int
+    action_count: int
+    empty_advance_count: int
+    is_non_terminating: bool
+
+
+class ProcessorState:
+    """Everything that changes while a Processor runs a program for one tile.
+
+    The program itself lives in the Processor, which every tile running it
+    shares, so a state is only the position in the code, the stack, the variable
+    slots and the counters. Programs translated to Python keep their position
+    in a generator instead.
+
+    snapshot and from_snapshot save and restore a state cheaply: pyscript
+    values are never changed in place, so copying the stack and slots
+    shallowly is enough. A snapshot is kept until the Processor next runs
+    the state, so tiles that haven't moved on share theirs between cycles.
+    """
+    __slots__ = (
+        "pc",
+        "stack",
+        "slots",
+        "generator",
+        "limit",
+        "is_halted",
+        "result",
+        "instruction_count",
+        "advance_count",
+        "action_count",
+        "empty_advance_count",
+        "is_non_terminating",
+        "cached_snapshot",
+        )
+    pc: int
+    stack: list[Any]
+    slots: list[Any]
+    generator: PythonGenerator | None
+    limit: list[int] # instruction count at which the generator runs out of fuel
+    is_halted: bool
+    result: Any
+    instruction_count: int
+    advance_count: int
+    action_count: int
+    empty_advance_count: int
+    is_non_terminating: bool
+    cached_snapshot: ProcessorSnapshot | None # cleared by the Processor whenever it runs the state
+
+    def __init__(self, slot_count: int) -> None:
+        self.pc = 0
+        self.stack = []
+        self.slots = [None] * slot_count
+        self.generator = None
+        self.limit = [0]
+        self.is_halted = False
+        self.result = None
+        self.instruction_count = 0
+        self.advance_count = 0
+        self.action_count = 0
+        self.empty_advance_count = 0
+        self.is_non_terminating = False
+        self.cached_snapshot = None
+
+    @classmethod
+    def from_snapshot(cls, snapshot: ProcessorSnapshot) -> ProcessorState:
+        """Return a new state exactly like the one the snapshot was taken of."""
+        state = cls(0)
+        state.pc = snapshot.pc
+        state.stack = list(snapshot.stack)
+        state.slots = list(snapshot.slots)
+        state.is_halted = snapshot.is_halted
+        state.result = snapshot.result
+        state.instruction_count = snapshot.instruction_count
+        state.advance_count = snapshot.advance_count
+        state.action_count = snapshot.action_count
+        state.empty_advance_count = snapshot.empty_advance_count
+        state.is_non_terminating = snapshot.is_non_terminating
+        state.cached_snapshot = snapshot
+        return state
+
+    def snapshot(self) -> ProcessorSnapshot:
+        """Return a copy of the state to restore later with from_snapshot.
+
+        Raises ValueError for programs translated to Python, as a generator can't be copied.
+        """
+        if self.generator is not None:
+            raise ValueError("Can't snapshot the state of a program translated to Python")
+        if self.cached_snapshot is None:
+            self.cached_snapshot = ProcessorSnapshot(
+                self.pc,
+                tuple(self.stack),
+                tuple(self.slots),
+                self.is_halted,
+                self.result,
+                self.instruction_count,
+                self.advance_count,
+                self.action_count,
+                self.empty_advance_count,
+                self.is_non_terminating,
+            )
+        return self.cached_snapshot
+
+    def get_stats(self) -> ProcessorStats:
+        return ProcessorStats(
+            self.instruction_count,
+            self.advance_count,
+            self.action_count,
+            self.empty_advance_count,
+            self.is_halted,
+            self.is_non_terminating,
+        )
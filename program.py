@@ -0,0 +1,170 @@
+"""Program class that holds the bytecode the compiler makes out of a ProcessTree
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass, field
+from itertools import repeat
+import operator
+from typing import Any, Iterator, Sequence, TYPE_CHECKING
+
+from enums import Opcode, OperandKind
+
+if TYPE_CHECKING:
+    from python_compiler import PythonProgram
+
+# what each binary opcode computes, indexed by opcode - Opcode.ADD
+BINARY_OPERATIONS = (
+    operator.add,
+    operator.sub,
+    operator.mul,
+    operator.truediv,
+    operator.floordiv,
+    operator.mod,
+    operator.pow,
+    operator.eq,
+    operator.ne,
+    operator.lt,
+    operator.le,
+    operator.gt,
+    operator.ge,
+    )
+# what the operands of each instruction refer to, for opcodes that have any
+OPERAND_KINDS = {
+    Opcode.PUSH_CONST:    (OperandKind.CONSTANT,),
+    Opcode.LOAD:          (OperandKind.SLOT,),
+    Opcode.STORE:         (OperandKind.SLOT,),
+    Opcode.CALL:          (OperandKind.FUNCTION, OperandKind.COUNT),
+    Opcode.ACT:           (OperandKind.ACTION,),
+    Opcode.JUMP:          (OperandKind.LABEL,),
+    Opcode.JUMP_IF_FALSE: (OperandKind.LABEL,),
+    Opcode.LOAD_CONST_OP: (OperandKind.SLOT, OperandKind.CONSTANT, OperandKind.OPERATOR),
+    Opcode.LOAD_LOAD_OP:  (OperandKind.SLOT, OperandKind.SLOT, OperandKind.OPERATOR),
+    Opcode.CONST_STORE:   (OperandKind.CONSTANT, OperandKind.SLOT),
+    }
+
+
+def _make_instruction_sizes() -> tuple[int, ...]:
+    sizes = [1] * (max(Opcode) + 1)
+    for opcode in Opcode:
+        sizes[opcode] = 1 + opcode.operand_count
+    return tuple(sizes)
+
+
+INSTRUCTION_SIZES = _make_instruction_sizes() # how many ints each instruction takes, indexed by opcode
+
+
+def make_instruction_indices(code: Sequence[int]) -> array:
+    """Map every offset in code to the number of instructions before it."""
+    indices = array("i")
+    offset = 0
+    instruction_index = 0
+    while offset < len(code):
+        size = INSTRUCTION_SIZES[code[offset]]
+        indices.extend(repeat(instruction_index, size))
+        offset += size
+        instruction_index += 1
+    return indices
+
+
+def make_constant_indices(constants: Sequence[Any]) -> dict[tuple[type, Any], int]:
+    """Map every constant to its first index, for add_constant.
+
+    Keyed by type too, or 1, 1.0 and True would share an entry.
+    """
+    return {(type(value), value): index for index, value in reversed(list(enumerate(constants)))}
+
+
+def add_constant(constants: list[Any], constant_indices: dict[tuple[type, Any], int], value: Any) -> int:
+    """Return the index of a value in constants, adding it if it isn't there yet."""
+    key = (type(value), value)
+    index = constant_indices.get(key)
+    if index is None:
+        index = len(constants)
+        constants.append(value)
+        constant_indices[key] = index
+    return index
+
+
+@dataclass(frozen=True)
+class Program:
+    """Compiled pyscript, ready to be run by a Processor.
+
+    code holds each instruction as its opcode followed by its operands,
+    in an array, or a memoryview of ints when loaded from a bytecode file.
+    Literals are indices into constants, variables are indices into the
+    slots of the Processor running the program (slot_names only names them
+    for debugging), and calls refer to functions by their index in function_names.
+    instruction_indices lets a Processor count the instructions it ran
+    from the offsets it jumped between, and is only made when not given.
+    When python_program is set, Processors run it instead of code.
+    max_stack_depth is only set by verify, and lets Processors run the code
+    without checks. lines holds the source line of every int in code, 0 where
+    it belongs to no line, and is None for programs that weren't compiled from source.
+    """
+    code: array | memoryview
+    constants: tuple[Any, ...]
+    slot_names: tuple[str, ...]
+    function_names: tuple[str, ...]
+    python_program: PythonProgram | None = field(default=None, repr=False, compare=False)
+    instruction_indices: array | memoryview | None = field(default=None, repr=False, compare=False)
+    max_stack_depth: int | None = field(default=None, compare=False)
+    lines: array | None = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.instruction_indices is None:
+            object.__setattr__(self, "instruction_indices", make_instruction_indices(self.code))
+
+    def iter_instructions(self) -> Iterator[tuple[int, Opcode, tuple[int, ...]]]:
+        """Yield the offset, opcode and operands of every instruction."""
+        code = self.code
+        offset = 0
+        while offset < len(code):
+            opcode = Opcode(code[offset])
+            operands = tuple(code[offset + 1 : offset + 1 + opcode.operand_count])
+            yield offset, opcode, operands
+            offset += 1 + opcode.operand_count
+
+    def disassemble(self) -> str:
+        """Return the program as one line per instruction, with the constants and names it uses."""
+        lines = []
+        for offset, opcode, operands in self.iter_instructions():
+            line = f"{offset:>6} {opcode.name:<13} {' '.join(map(str, operands)):<12}"
+            comment = self._describe_operands(opcode, operands)
+            if comment:
+                line = f"{line} # {comment}"
+            lines.append(line.rstrip())
+        return "\n".join(lines)
+
+    def _describe_operands(self, opcode: Opcode, operands: tuple[int, ...]) -> str:
+        match opcode:
+            case Opcode.PUSH_CONST:
+                return repr(self.constants[operands[0]])
+            case Opcode.LOAD | Opcode.STORE:
+                return self.slot_names[operands[0]]
+            case Opcode.CALL:
+                return self.function_names[operands[0]]
+            case Opcode.LOAD_CONST_OP:
+                return f"{self.slot_names[operands[0]]} {Opcode(operands[2]).name} {self.constants[operands[1]]!r}"
+            case Opcode.LOAD_LOAD_OP:
+                return f"{self.slot_names[operands[0]]} {Opcode(operands[2]).name} {self.slot_names[operands[1]]}"
+            case Opcode.CONST_STORE:
+                return f"{self.slot_names[operands[1]]} = {self.constants[operands[0]]!r}"
+            case _:
+                return ""
+
+    def get_size(self) -> int:
+        """Return roughly how many bytes the program takes, not counting the constants themselves."""
+        return (
+            self.code.itemsize * len(self.code)
+            + self.instruction_indices.itemsize * len(self.instruction_indices)
+            + (0 if self.lines is None else self.lines.itemsize * len(self.lines))
+            + 8 * (len(self.constants) + len(self.slot_names) + len(self.function_names))
+        )
+
+
+EMPTY_PROGRAM = Program(array("i", (Opcode.HALT,)), (), (), ())
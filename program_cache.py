@@ -0,0 +1,133 @@
+"""ProgramCache class that keeps the parser's results on disk, keyed by source content
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from hashlib import sha256
+import logging
+import os
+from pathlib import Path
+import pickle
+import shutil
+
+from common import CACHE_DIR
+from parser import PARSER_VERSION, ProcessTree
+from program import Program
+from token_buffer import TokenBuffer
+
+logger = logging.getLogger(__name__)
+
+CACHE_EXTENSION = ".pickle"
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024 # bytes
+
+
+@dataclass
+class CacheEntry:
+    """Everything the front end made out of one source."""
+    tokens: TokenBuffer
+    process_tree: ProcessTree | None = None
+    program: Program | None = None
+
+
+class ProgramCache:
+    """Parser results stored under CACHE_DIR, one file per source content hash.
+
+    Entries live in a directory named after PARSER_VERSION, and the directories
+    of other versions are deleted on creation, so a parser change never loads
+    stale entries. When the entries grow past max_size, the least recently
+    used ones are evicted. Cache failures are logged and never raised.
+    """
+    directory: Path
+    max_size: int
+
+    def __init__(self, root: Path = CACHE_DIR, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.directory = root / f"v{PARSER_VERSION}"
+        self.max_size = max_size
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for path in root.iterdir():
+                if path.is_dir() and path != self.directory:
+                    logger.debug("Deleting outdated cache directory '%s'", path)
+                    shutil.rmtree(path, ignore_errors=True)
+        except OSError as e:
+            logger.warning("Failed to prepare cache directory '%s': %s", self.directory, e)
+
+    @staticmethod
+    def make_key(source: bytes) -> str:
+        return sha256(source).hexdigest()
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Return the entry stored for a key, or None if there's no usable one."""
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as file:
+                version, entry = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError) as e:
+            logger.warning("Dropping unreadable cache entry '%s': %s", path, e)
+            path.unlink(missing_ok=True)
+            return None
+
+        if version != PARSER_VERSION or not isinstance(entry, CacheEntry):
+            logger.warning("Dropping outdated cache entry '%s'", path)
+            path.unlink(missing_ok=True)
+            return None
+
+        # mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        logger.debug("Loaded cache entry '%s'", path)
+        return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry for a key, replacing any previous one."""
+        path = self._get_path(key)
+        temporary_path = path.with_suffix(".tmp")
+        try:
+            with open(temporary_path, "wb") as file:
+                pickle.dump((PARSER_VERSION, entry), file, pickle.HIGHEST_PROTOCOL)
+            # readers never see a half-written entry
+            os.replace(temporary_path, path)
+        except (OSError, pickle.PicklingError, RecursionError) as e:
+            logger.warning("Failed to store cache entry '%s': %s", path, e)
+            temporary_path.unlink(missing_ok=True)
+            return
+
+        logger.debug("Stored cache entry '%s'", path)
+        self._evict()
+
+    def clear(self) -> None:
+        for path in self.directory.glob(f"*{CACHE_EXTENSION}"):
+            path.unlink(missing_ok=True)
+
+    def _get_path(self, key: str) -> Path:
+        return self.directory / f"{key}{CACHE_EXTENSION}"
+
+    def _evict(self) -> None:
+        """Delete the least recently used entries until the cache fits in max_size."""
+        try:
+            entries = [
+                (stat.st_mtime, stat.st_size, path)
+                for path in self.directory.glob(f"*{CACHE_EXTENSION}")
+                if (stat := path.stat())
+            ]
+        except OSError as e:
+            logger.warning("Failed to list cache directory '%s': %s", self.directory, e)
+            return
+
+        total_size = sum(size for _mtime, size, _path in entries)
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            logger.debug("Evicting cache entry '%s'", path)
+            path.unlink(missing_ok=True)
+            total_size -= size
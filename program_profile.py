@@ -0,0 +1,73 @@
+"""ProgramProfile class that collects what every instruction of a Program costs while a Processor runs it
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+
+from program import Program
+
+
+@dataclass(frozen=True)
+class LineStats:
+    """What the instructions of one source line cost, summed over a profile."""
+    line: int # 0 for instructions that belong to no line
+    execution_count: int
+    time: float # seconds
+
+
+class ProgramProfile:
+    """Execution counts and times of every instruction of a Program.
+
+    Both lists are indexed by offset in the program's code, and filled in by
+    a Processor made with the profile. The time of an instruction lasts until
+    the next one starts, so calls include the builtin they call, and the
+    profiling itself makes every instruction slower by about the same amount.
+    get_line_stats adds them up by the source lines of the program.
+
+    Tiles sharing a Processor share its profile too, and rewinding a level
+    doesn't take anything out of it.
+    """
+    program: Program
+    counts: list[int]
+    times: list[float]
+
+    def __init__(self, program: Program) -> None:
+        self.program = program
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * len(self.program.code)
+        self.times = [0.0] * len(self.program.code)
+
+    def get_total_time(self) -> float:
+        return sum(self.times)
+
+    def get_line_stats(self) -> dict[int, LineStats]:
+        """Return the stats of every line that ran any instructions, by line.
+
+        Programs without lines, like those read from bytecode files, have everything on line 0.
+        """
+        counts: dict[int, int] = {}
+        times: dict[int, float] = {}
+        lines = self.program.lines
+        for offset, count in enumerate(self.counts):
+            if count == 0:
+                continue
+            line = 0 if lines is None else lines[offset]
+            counts[line] = counts.get(line, 0) + count
+            times[line] = times.get(line, 0.0) + self.times[offset]
+        return {line: LineStats(line, counts[line], times[line]) for line in sorted(counts)}
+
+    def format_report(self, limit: int = 10) -> str:
+        """Return the lines that took the most time, as a table."""
+        total_time = self.get_total_time()
+        rows = [f"{'line':>6} {'count':>10} {'time (ms)':>10} {'share':>6}"]
+        by_time = sorted(self.get_line_stats().values(), key=lambda stats: stats.time, reverse=True)
+        for stats in by_time[:limit]:
+            share = stats.time / total_time if total_time > 0 else 0.0
+            rows.append(f"{stats.line:>6} {stats.execution_count:>10} {stats.time * 1000:>10.3f} {share:>6.1%}")
+        return "\n".join(rows)
@@ -5,7 +5,7 @@ Contributors:
     Widmo
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
 
 from enums import TokenType
@@ -15,6 +15,18 @@ from enums import TokenType
 class Token(object):
     type: TokenType
     value: Any
+    # position in the source, 0 if unknown; two tokens are equal regardless of where they are
+    line: int = field(default=0, compare=False)
+    column: int = field(default=0, compare=False)
+
+    def __init__(self, type: TokenType, value: Any, line: int = 0, column: int = 0) -> None:
+        # the generated __init__ of a frozen dataclass sets every field with object.__setattr__,
+        # which made building Tokens take as long as finding them in the source
+        fields = self.__dict__
+        fields["type"] = type
+        fields["value"] = value
+        fields["line"] = line
+        fields["column"] = column
 
     def __repr__(self):
         if self.value is None:
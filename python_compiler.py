@@ -0,0 +1,241 @@
+"""PythonCompiler class that turns a ProcessTree into a Python generator, the fast tier of the Processor
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+import logging
+from typing import Any, Callable, Generator, Sequence, TYPE_CHECKING
+
+from compiler import ACTION_FUNCTIONS, BaseCompiler, TILE_ACTIONS
+from enums import NodeType
+
+if TYPE_CHECKING:
+    from parser import ProcessNode, ProcessTree
+
+logger = logging.getLogger(__name__)
+
+# Python refuses code nested past 100 indents or 200 parentheses, so deeper programs stay with the bytecode
+MAX_NESTING = 90
+GENERATED_FILENAME = "<pyscript>"
+GENERATED_FUNCTION_NAME = "_run"
+INDENT = "    "
+
+# yields (TILE_ACTIONS index or None, instruction count) and returns (result, instruction count)
+PythonGenerator = Generator[tuple[int | None, int], None, tuple[Any, int]]
+
+
+@dataclass(frozen=True)
+class PythonProgram:
+    """A program translated to the source of a Python generator function.
+
+    The function takes the constants, the functions in the order of
+    function_names and a one item list holding the instruction count at which
+    it runs out of fuel. Each yield is an action, or None when the fuel ran out,
+    and the total instruction count so far. Only the source is pickled,
+    the function is compiled again on loading.
+    """
+    source: str
+    constants: tuple[Any, ...]
+    function_names: tuple[str, ...]
+    function: Callable[..., PythonGenerator] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        namespace: dict[str, Any] = {}
+        exec(compile(self.source, GENERATED_FILENAME, "exec"), namespace)
+        object.__setattr__(self, "function", namespace[GENERATED_FUNCTION_NAME])
+
+    def __reduce__(self) -> tuple[type, tuple[Any, ...]]:
+        return PythonProgram, (self.source, self.constants, self.function_names)
+
+    def start(self, functions: list[Callable], limit: list[int]) -> PythonGenerator:
+        return self.function(self.constants, functions, limit)
+
+
+class PythonCompiler(BaseCompiler):
+    """Turns a ProcessTree into a Python generator function.
+
+    Variables become locals, one per slot the Compiler would give them, and
+    operators become Python operators, so the program runs without an
+    instruction dispatch loop. Actions are yields.
+
+    Instructions are counted as the bytecode runs them: the count of every
+    straight run of code is known while compiling, and added up wherever
+    control moves, which is also where a loop checks its fuel. Runs are
+    positions in the Compiler's bytecode, and with the Optimizer's kept_counts,
+    they count what's left of them after optimizing, so the translation runs
+    out of fuel exactly where the optimized bytecode does.
+    """
+    lines: list[str]
+    kept_counts: Sequence[int] | None # Optimizer.kept_counts of the bytecode being matched
+    position: int # index in the Compiler's bytecode of the next instruction
+    run_start: int # position when the count was last updated in the generated code
+
+    def compile(self, tree: ProcessTree, kept_counts: Sequence[int] | None = None) -> PythonProgram | None:
+        """Return the translated program, or None if Python can't compile it.
+
+        Without kept_counts, instructions are counted like the unoptimized bytecode.
+        """
+        self._reset()
+        self.kept_counts = kept_counts
+        try:
+            self._add_statement(tree.get_root(), 1)
+        except RecursionError as e:
+            logger.info("Not translating '%s' to Python: %s", self.path, e)
+            self._reset()
+            return None
+        # the HALT at the end
+        self.position += 1
+        self._add_line(1, f"return (None, e + {self._get_pending()})")
+        self._add_line(1, "yield # never runs, makes the function a generator even without actions")
+        if kept_counts is not None and self.position != len(kept_counts) - 1:
+            # a compiler bug, the bytecode still counts right
+            logger.error("Translation of '%s' has %d instructions, its bytecode %d", self.path, self.position, len(kept_counts) - 1)
+            self._reset()
+            return None
+
+        try:
+            program = PythonProgram(self._make_source(), tuple(self.constants), tuple(self.function_indices))
+        except (SyntaxError, RecursionError, MemoryError) as e:
+            logger.info("Python failed to compile '%s': %s", self.path, e)
+            program = None
+        else:
+            logger.info("Translated '%s' into %d lines of Python", self.path, len(self.lines))
+        self._reset()
+        return program
+
+    def _reset(self) -> None:
+        super()._reset()
+        self.lines = []
+        self.kept_counts = None
+        self.position = 0
+        self.run_start = 0
+
+    def _make_source(self) -> str:
+        header = [f"def {GENERATED_FUNCTION_NAME}(constants, functions, limit):"]
+        if len(self.constants) > 0:
+            names = ", ".join(f"k{index}" for index in range(len(self.constants)))
+            header.append(f"{INDENT}{names}, = constants")
+        if len(self.function_indices) > 0:
+            names = ", ".join(f"f{index}" for index in range(len(self.function_indices)))
+            header.append(f"{INDENT}{names}, = functions")
+        header.append(f"{INDENT}e = 0")
+        return "\n".join(header + self.lines) + "\n"
+
+    def _add_statement(self, node: ProcessNode, depth: int) -> None:
+        if depth > MAX_NESTING:
+            raise RecursionError(f"loops nested deeper than {MAX_NESTING}")
+        children = node.get_children()
+        if node.get_line() > 0:
+            self.line = node.get_line()
+        match node.get_type():
+            case NodeType.CLOSURE:
+                self._open_scope()
+                for child in children:
+                    self._add_statement(child, depth)
+                self._close_scope()
+
+            case NodeType.LOOP:
+                condition, body = children
+                self._add_count(depth)
+                self._add_line(depth, "while True:")
+                condition = self._make_expression(condition, 1)
+                self.position += 1 # JUMP_IF_FALSE
+                self._add_line(depth + 1, f"if not {condition}:")
+                pending = self._get_pending()
+                if pending > 0:
+                    self._add_line(depth + 2, f"e += {pending}")
+                self._add_line(depth + 2, "break")
+                self._add_statement(body, depth + 1)
+                self.position += 1 # JUMP
+                self._add_count(depth + 1)
+                self._add_line(depth + 1, "if e >= limit[0]:")
+                self._add_line(depth + 2, "yield (None, e)")
+
+            case NodeType.DEFINE:
+                # declared after the value is made, like the Compiler does
+                value = self._make_value(children)
+                slot = self._declare(*node.get_value())
+                self.position += 1 # STORE
+                self._add_line(depth, f"v{slot} = {value}")
+
+            case NodeType.WRITE:
+                slot = self._resolve_variable(node.get_value())
+                value = self._make_expression(children[0], 1)
+                self.position += 1 # STORE
+                self._add_line(depth, f"v{slot} = {value}")
+
+            case NodeType.RETURN | NodeType.EXIT:
+                value = self._make_value(children)
+                self.position += 1 # RETURN or EXIT
+                self._add_line(depth, f"return ({value}, e + {self._get_pending()})")
+
+            case _:
+                expression = self._make_expression(node, 1)
+                self.position += 1 # POP
+                self._add_line(depth, expression)
+
+    def _make_expression(self, node: ProcessNode, depth: int) -> str:
+        """Return the Python expression for a node, counting its instructions in evaluation order."""
+        if depth > MAX_NESTING:
+            raise RecursionError(f"expressions nested deeper than {MAX_NESTING}")
+        children = node.get_children()
+        match node.get_type():
+            case NodeType.LITERAL:
+                self.position += 1
+                return f"k{self._get_constant_index(node.get_value())}"
+
+            case NodeType.READ:
+                self.position += 1
+                return f"v{self._resolve(node.get_value())[0]}"
+
+            case NodeType.CALL if node.get_value() in ACTION_FUNCTIONS:
+                if len(children) > 0:
+                    self._raise_syntax_error(f"'{node.get_value()}' takes no arguments")
+                self.position += 1
+                action_index = TILE_ACTIONS.index(ACTION_FUNCTIONS[node.get_value()])
+                # the value of a yield is None, just like an action's
+                return f"(yield ({action_index}, e + {self._get_pending()}))"
+
+            case NodeType.CALL:
+                name = node.get_value()
+                function_index = self._get_function_index(name)
+                arguments = [self._make_expression(child, depth + 1) for child in children]
+                self.position += 1
+                return f"f{function_index}({', '.join(arguments)})"
+
+            case NodeType.OPERATION:
+                operands = [self._make_expression(child, depth + 1) for child in children]
+                self.position += 1
+                if len(operands) == 1:
+                    return f"(-{operands[0]})"
+                return f"({operands[0]} {node.get_value()} {operands[1]})"
+
+            case node_type:
+                self._raise_syntax_error(f"{node_type} can't be used as a value")
+
+    def _make_value(self, children: list[ProcessNode]) -> str:
+        """Return the optional value of a statement; a missing value is None."""
+        if len(children) > 0:
+            return self._make_expression(children[0], 1)
+        self.position += 1
+        return f"k{self._get_constant_index(None)}"
+
+    def _get_pending(self) -> int:
+        """Return how many instructions ran since the count was last updated in the generated code."""
+        if self.kept_counts is None:
+            return self.position - self.run_start
+        return self.kept_counts[self.position] - self.kept_counts[self.run_start]
+
+    def _add_count(self, depth: int) -> None:
+        """Add the pending instructions to the count in the generated code."""
+        pending = self._get_pending()
+        if pending > 0:
+            self._add_line(depth, f"e += {pending}")
+        self.run_start = self.position
+
+    def _add_line(self, depth: int, line: str) -> None:
+        self.lines.append(INDENT * depth + line)
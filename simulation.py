@@ -0,0 +1,306 @@
+"""Simulation class that runs a level and its tiles' programs without a display or events
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+import logging
+from math import inf
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from enums import Direction, TileAction, TileType
+from level import Level
+from matrix import Matrix
+from processor import Processor
+from processor_state import ProcessorStats
+from program import Program
+from program_profile import ProgramProfile
+from tile_data import TileData
+from tile_index import TileIndex
+from tile_model import TileModel
+from timeline import DEFAULT_KEYFRAME_INTERVAL, Timeline
+
+if TYPE_CHECKING:
+    from parser import Function
+
+logger = logging.getLogger(__name__)
+
+
+class Simulation:
+    """The rules of a level, stepped one cycle at a time.
+
+    Every step, each tile picks its action, from its program or its type,
+    and the actions are then carried out in order of action_priority.
+    The level is complete once no flag is left.
+
+    Nothing here talks to Tk or the event bus: the tiles that changed are
+    collected instead, for take_changes to hand to whoever shows the level.
+    PyscriptRuntimeErrors of the programs are raised from step as they are.
+
+    Every step goes into the timeline, with only the tiles it changed; tiles
+    running a program count as changed whenever their program runs. seek
+    moves to any stored step and back, changing only the tiles that differ.
+    Stepping, or loading a program, anywhere but at the end of the timeline
+    forgets the steps after that point.
+
+    Tiles are only changed through set_tile_model and tile_config, which
+    keep tile_data_matrix and tile_index up to date, so finding the flags,
+    the players or the tiles that act doesn't scan the level. A step only
+    visits the tiles that act.
+    """
+    level: Level
+    tile_model_matrix: Matrix[TileModel]
+    tile_data_matrix: Matrix[TileData] # the tile data of tile_model_matrix, for the tiles to look around
+    tile_index: TileIndex
+    timeline: Timeline
+    step_index: int # steps the level is at, at most len(timeline)
+    changed: dict[tuple[int, int], None] # coordinates of tiles changed since take_changes, in order
+    step_changes: dict[tuple[int, int], None] | None # coordinates of tiles the running step changed
+
+    def __init__(self, level: Level, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL) -> None:
+        self.level = level
+        self.tile_data_matrix = level.get_tile_data_matrix()
+        self.tile_model_matrix = self.tile_data_matrix.map(TileModel)
+        self.tile_index = TileIndex(self.tile_data_matrix)
+        self.timeline = Timeline(keyframe_interval)
+        self.step_index = 0
+        self.changed = {}
+        self.step_changes = None
+
+    def get_step_count(self) -> int:
+        return self.step_index
+
+    def check_win_state(self) -> bool:
+        return self.tile_index.count(TileType.FLAG) == 0
+
+    def has_running_programs(self) -> bool:
+        """Return whether any tile runs a program that hasn't halted yet; only players run programs."""
+        for x, y in self.tile_index.positions[TileType.PLAYER]:
+            processor_state = self.tile_model_matrix.get(x, y).processor_state
+            if processor_state is not None and not processor_state.is_halted:
+                return True
+        return False
+
+    def is_over(self) -> bool:
+        """Return whether the level is complete, or can't be anymore because every program halted."""
+        return self.check_win_state() or not self.has_running_programs()
+
+    def load_program(
+        self,
+        program: Program,
+        builtins: tuple[Function, ...],
+        profile: ProgramProfile | None = None,
+    ) -> None:
+        """Make every player tile start running program, with the builtins it was linked to.
+
+        All of them share one Processor, and only get a state of their own.
+        With a profile, the Processor profiles the program for all of them together.
+        """
+        self.timeline.truncate(self.step_index)
+        processor = Processor(program, builtins, profile=profile)
+        for x, y in self.tile_index.get_positions(TileType.PLAYER):
+            tile_model = self.tile_model_matrix.get(x, y)
+            self.set_tile_model(x, y, TileModel(tile_model.tile_data, processor))
+
+    def get_processor_stats(self) -> list[tuple[int, int, ProcessorStats]]:
+        """Return the counters of every tile that runs a program, with its coordinates."""
+        return [
+            (x, y, tile_model.processor_state.get_stats())
+            for x, y, tile_model in self.tile_model_matrix.iter_xy()
+            if tile_model.processor_state is not None
+        ]
+
+    def take_changes(self) -> list[tuple[int, int, TileData]]:
+        """Return the coordinates and data of every tile changed since the last call, once each."""
+        changes = [(x, y, self.tile_model_matrix.get(x, y).tile_data) for x, y in self.changed]
+        self.changed = {}
+        return changes
+
+    def step(self) -> bool:
+        """Run one cycle, or return False without doing anything if the level is already complete."""
+        if self.check_win_state():
+            return False
+
+        self.timeline.truncate(self.step_index)
+        if not self.timeline.is_started():
+            self.timeline.start(self.tile_model_matrix)
+        self.step_changes = {}
+        try:
+            # actors come in the order they act, so their actions need no sorting
+            tile_actions = []
+            for x, y in self.tile_index.get_actors():
+                tile_model = self.tile_model_matrix.get(x, y)
+                if tile_model.processor_state is not None and not tile_model.processor_state.is_halted:
+                    # running the program changes the tile
+                    self.step_changes[x, y] = None
+                action = tile_model.get_action(x, y, self.tile_data_matrix, self.tile_index)
+                if action is not None:
+                    tile_actions.append((x, y, action))
+
+            for x, y, action in tile_actions:
+                self.process_tile_action(x, y, action)
+        finally:
+            # a step that failed halfway still happened
+            delta = {
+                (x, y): self.tile_model_matrix.get(x, y).snapshot()
+                for x, y in self.step_changes
+            }
+            self.step_changes = None
+            self.timeline.append(delta, self.tile_model_matrix)
+            self.step_index += 1
+        return True
+
+    def run(self, max_steps: int, time_budget: float | None = None) -> bool:
+        """Step until the level is over, at most max_steps times, and return whether it's complete.
+
+        With a time_budget, also stop stepping once that many seconds have passed.
+        """
+        deadline = inf if time_budget is None else perf_counter() + time_budget
+        for _ in range(max_steps):
+            if self.is_over():
+                break
+            self.step()
+            if perf_counter() >= deadline:
+                break
+        return self.check_win_state()
+
+    def restart(self) -> None:
+        if len(self.timeline) == 0:
+            return
+
+        self.rewind(0)
+
+    def seek(self, step: int) -> None:
+        """Put the level the way it was after a number of steps, keeping the timeline as it is."""
+        if not 0 <= step <= len(self.timeline):
+            raise IndexError(f"Step {step} is not in the timeline of {len(self.timeline)} steps")
+        if step == self.step_index:
+            return
+        changed_tiles = self.timeline.get_changed_tiles(self.step_index, step)
+        for (x, y), tile_snapshot in self.timeline.get_tiles(step, changed_tiles).items():
+            self.set_tile_model(x, y, TileModel.from_snapshot(tile_snapshot))
+        self.step_index = step
+
+    def rewind(self, cycle: int) -> None:
+        """Put the level back the way it was before the step of a cycle, and forget that step and the later ones."""
+        self.seek(cycle)
+        self.timeline.truncate(cycle)
+
+    def step_back(self) -> None:
+        if self.step_index == 0:
+            return
+
+        self.rewind(self.step_index - 1)
+
+    def move_tile(self, x: int, y: int, direction: Direction) -> None:
+        to_x = x + direction.x
+        to_y = y + direction.y
+
+        try:
+            from_tile_model = self.tile_model_matrix.get(x, y)
+            to_tile_model = self.tile_model_matrix.get(to_x, to_y)
+            assert to_tile_model.tile_data.tile_type.is_walkable
+        except (IndexError, AssertionError):
+            return
+
+        logger.debug(
+            "Moving tile %s from (%i, %i) in direction %s (%s)",
+            from_tile_model.tile_data.tile_type,
+            x,
+            y,
+            direction,
+            to_tile_model.tile_data.tile_type,
+        )
+
+        if (
+            from_tile_model.tile_data.tile_type is TileType.PLAYER
+            and to_tile_model.tile_data.tile_type is TileType.FLAG
+        ):
+            self.set_tile_model(to_x, to_y, TileModel(TileData(TileType.WIN)))
+        else:
+            self.set_tile_model(to_x, to_y, from_tile_model)
+
+        self.set_tile_model(x, y, TileModel())
+
+    def process_tile_action(self, x: int, y: int, action: TileAction) -> None:
+        tile_data = self.tile_model_matrix.get(x, y).tile_data
+
+        match action:
+            case TileAction.MOVE_FORWARD:
+                self.move_tile(x, y, tile_data.tile_direction)
+
+            case TileAction.MOVE_BACK:
+                self.move_tile(x, y, -tile_data.tile_direction)
+
+            case TileAction.TURN_LEFT:
+                self.tile_config(x, y, tile_direction=tile_data.tile_direction.rotate())
+
+            case TileAction.TURN_RIGHT:
+                self.tile_config(x, y, tile_direction=tile_data.tile_direction.rotate(True))
+
+            case TileAction.ATTACK:
+                # TODO: Implement attacking.
+                pass
+
+            case _:
+                logger.error("Unknown tile action %s", action)
+
+    def set_tile_model(self, x: int, y: int, tile_model: TileModel) -> None:
+        from_type = self.tile_model_matrix.get(x, y).tile_data.tile_type
+        self.tile_model_matrix.set(x, y, tile_model)
+        self.tile_data_matrix.set(x, y, tile_model.tile_data)
+        self.tile_index.move(x, y, from_type, tile_model.tile_data.tile_type)
+        self.changed[x, y] = None
+        if self.step_changes is not None:
+            self.step_changes[x, y] = None
+
+    def tile_config(
+        self,
+        x: int,
+        y: int,
+        tile_type: TileType | str | None = None,
+        tile_direction: Direction | str  | None = None,
+    ) -> None:
+        tile_data = self.tile_model_matrix.get(x, y).tile_data
+
+        if tile_type is not None:
+            from_type = tile_data.tile_type
+            tile_data.tile_type = TileType.normalize(tile_type)
+            self.tile_index.move(x, y, from_type, tile_data.tile_type)
+        if tile_direction is not None:
+            tile_data.tile_direction = Direction.normalize(tile_direction)
+
+        self.changed[x, y] = None
+        if self.step_changes is not None:
+            self.step_changes[x, y] = None
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from pathlib import Path
+
+    from linker import link
+    from parser import Function, FunctionHolder, hello_world, Parser
+
+    argument_parser = ArgumentParser(description="Run a level with a pyscript file, without a window.")
+    argument_parser.add_argument("level", type=Path, help="a level .yaml file")
+    argument_parser.add_argument("pyscript", type=Path, help="the program of the player tiles")
+    argument_parser.add_argument("--max-steps", type=int, default=1000)
+    arguments = argument_parser.parse_args()
+
+    parser = Parser(FunctionHolder(), arguments.pyscript)
+    program = parser.compile(parser.parse(parser.tokenize_buffer()))
+    function_holder = FunctionHolder()
+    function_holder.add(Function(print, object))
+    function_holder.add(Function(hello_world))
+    function_holder.add(Function(hello_world), "hello")
+
+    simulation = Simulation(Level.from_path(arguments.level))
+    simulation.load_program(program, link(program, function_holder))
+    is_complete = simulation.run(arguments.max_steps)
+    print(f"{'Complete' if is_complete else 'Not complete'} after {simulation.get_step_count()} steps")
+    for x, y, stats in simulation.get_processor_stats():
+        print(f"Processor at ({x}, {y}): {stats}")
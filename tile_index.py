@@ -0,0 +1,58 @@
+"""TileIndex class that keeps where the tiles of every type are in a level
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+
+from enums import TileType
+from matrix import Matrix
+from tile_data import TileData
+
+# the types of tiles that act, in buckets of the same action_priority, lowest first
+ACTOR_BUCKETS = tuple(
+    tuple(tile_type for tile_type in TileType if tile_type.is_actor and tile_type.action_priority == priority)
+    for priority in sorted({tile_type.action_priority for tile_type in TileType if tile_type.is_actor})
+)
+
+
+class TileIndex:
+    """The coordinates of the tiles of each TileType, kept up to date as tiles change.
+
+    Whoever changes a tile's type tells the index with move, so questions
+    like how many flags are left, where the players are or which tiles act
+    don't scan the level.
+    """
+    positions: dict[TileType, set[tuple[int, int]]]
+
+    def __init__(self, tile_data_matrix: Matrix[TileData]) -> None:
+        self.positions = {tile_type: set() for tile_type in TileType}
+        for x, y, tile_data in tile_data_matrix.iter_xy():
+            self.positions[tile_data.tile_type].add((x, y))
+
+    def count(self, tile_type: TileType) -> int:
+        return len(self.positions[tile_type])
+
+    def get_positions(self, tile_type: TileType) -> list[tuple[int, int]]:
+        """Return the coordinates of the tiles of a type, row by row like Matrix.iter_xy."""
+        return sorted(self.positions[tile_type], key=lambda xy: (xy[1], xy[0]))
+
+    def get_actors(self) -> list[tuple[int, int]]:
+        """Return the coordinates of every tile that can act, in the order they act.
+
+        That is by action_priority, and row by row among tiles of the same priority.
+        """
+        actors = []
+        for tile_types in ACTOR_BUCKETS:
+            bucket = set().union(*(self.positions[tile_type] for tile_type in tile_types))
+            actors.extend(sorted(bucket, key=lambda xy: (xy[1], xy[0])))
+        return actors
+
+    def move(self, x: int, y: int, from_type: TileType, to_type: TileType) -> None:
+        """Record that the tile at (x, y) changed from one type to another."""
+        if from_type is to_type:
+            return
+        self.positions[from_type].discard((x, y))
+        self.positions[to_type].add((x, y))
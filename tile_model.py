@@ -5,51 +5,66 @@ Contributors:
     Romcode
 """
 
-from dataclasses import dataclass, field
+from __future__ import annotations
+from dataclasses import dataclass, field, replace
 
 import logging
 from math import inf
-from tkinter.simpledialog import askstring
 
-import events
 from astar import astar
 from enums import TileAction, TileType
 from matrix import Matrix
-from parser import Processor
+from processor import IDLE_PROCESSOR, Processor
+from processor_state import ProcessorSnapshot, ProcessorState
 from tile_data import TileData
+from tile_index import TileIndex
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class TileSnapshot:
+    """A TileModel as it was at one moment, for the history of a Simulation."""
+    tile_data: TileData
+    processor: Processor | None = None
+    processor_snapshot: ProcessorSnapshot | None = None
+
+
 @dataclass(frozen=True)
 class TileModel:
     tile_data: TileData = field(default_factory=TileData)
     processor: Processor | None = None
+    processor_state: ProcessorState | None = None
 
     def __post_init__(self) -> None:
         if self.processor is None and self.tile_data.tile_type is TileType.PLAYER:
-            object.__setattr__(self, "processor", Processor([]))
+            object.__setattr__(self, "processor", IDLE_PROCESSOR)
+        if self.processor is not None and self.processor_state is None:
+            object.__setattr__(self, "processor_state", self.processor.make_state())
+
+    @classmethod
+    def from_snapshot(cls, snapshot: TileSnapshot) -> TileModel:
+        processor_state = None
+        if snapshot.processor_snapshot is not None:
+            processor_state = ProcessorState.from_snapshot(snapshot.processor_snapshot)
+        return cls(replace(snapshot.tile_data), snapshot.processor, processor_state)
+
+    def snapshot(self) -> TileSnapshot:
+        """Return a copy of the tile, sharing the Processor but not the tile data or the processor state."""
+        processor_snapshot = None
+        if self.processor_state is not None:
+            processor_snapshot = self.processor_state.snapshot()
+        return TileSnapshot(replace(self.tile_data), self.processor, processor_snapshot)
 
     def get_action(
         self,
         self_x: int,
         self_y: int,
-        tile_data_matrix: Matrix[TileData]
+        tile_data_matrix: Matrix[TileData],
+        tile_index: TileIndex | None = None,
     ) -> TileAction | None:
         if self.processor is not None:
-            # TODO: Remove manual movement.
-            match askstring("Player movement", "Player movement (wasd): "):
-                case "w":
-                    return TileAction.MOVE_FORWARD
-                case "s":
-                    return TileAction.MOVE_BACK
-                case "a":
-                    return TileAction.TURN_LEFT
-                case "d":
-                    return TileAction.TURN_RIGHT
-                case _:
-                    events.RunRequested(None)
-            # return self.processor.advance(self_x, self_y, tile_data_matrix)
+            return self.processor.advance(self.processor_state, self_x, self_y, tile_data_matrix)
 
         # If no pyscript processor, match behavior to tile type.
         match self.tile_data.tile_type:
@@ -59,12 +74,15 @@ class TileModel:
 
             case TileType.ENEMY:
                 # Get coordinates of all players.
-                player_positions = tuple(
-                    (x, y)
-                    for x, y, tile_data
-                    in tile_data_matrix.iter_xy()
-                    if tile_data.tile_type is TileType.PLAYER
-                )
+                if tile_index is not None:
+                    player_positions = tuple(tile_index.get_positions(TileType.PLAYER))
+                else:
+                    player_positions = tuple(
+                        (x, y)
+                        for x, y, tile_data
+                        in tile_data_matrix.iter_xy()
+                        if tile_data.tile_type is TileType.PLAYER
+                    )
 
                 if len(player_positions) == 0:
                     return None
@@ -0,0 +1,123 @@
+"""Timeline class that stores every step of a Simulation as keyframes and deltas
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+
+from matrix import Matrix
+from tile_model import TileModel, TileSnapshot
+
+DEFAULT_KEYFRAME_INTERVAL = 64 # steps
+
+
+class Timeline:
+    """The state of a level after each of its steps, for seeking to any of them.
+
+    Every keyframe_interval steps the whole level is kept, and in between
+    only the tiles each step changed, as they were after it. So the tiles
+    at any step are a keyframe with at most keyframe_interval - 1 deltas on
+    top. A bigger interval takes less memory, but makes seeking slower.
+    Keyframes after the first only take new snapshots of the tiles changed
+    since the one before, so big levels where few tiles change stay cheap.
+
+    For each span of steps between keyframes, the tiles changed anywhere in
+    it are kept too, so finding what differs between two distant steps
+    doesn't go through every step in between, or any span when there are more
+    of them than tiles.
+    """
+    keyframe_interval: int
+    keyframes: list[Matrix[TileSnapshot]] # keyframes[i] is the level at step i * keyframe_interval
+    deltas: list[dict[tuple[int, int], TileSnapshot]] # deltas[i] is what step i changed, after it
+    span_changes: list[set[tuple[int, int]]] # span_changes[i] has the tiles changed after keyframes[i]
+
+    def __init__(self, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL) -> None:
+        if keyframe_interval < 1:
+            raise ValueError(f"Keyframe interval must be at least 1, got {keyframe_interval}")
+        self.keyframe_interval = keyframe_interval
+        self.keyframes = []
+        self.deltas = []
+        self.span_changes = []
+
+    def __len__(self) -> int:
+        """Return the number of steps stored."""
+        return len(self.deltas)
+
+    def is_started(self) -> bool:
+        return len(self.keyframes) > 0
+
+    def start(self, tile_model_matrix: Matrix[TileModel]) -> None:
+        """Keep the level before its first step."""
+        self.keyframes = [tile_model_matrix.map(TileModel.snapshot)]
+        self.deltas = []
+        self.span_changes = [set()]
+
+    def append(self, delta: dict[tuple[int, int], TileSnapshot], tile_model_matrix: Matrix[TileModel]) -> None:
+        """Add a step, from the tiles it changed and the level after it."""
+        self.deltas.append(delta)
+        self.span_changes[-1].update(delta)
+        if len(self.deltas) % self.keyframe_interval == 0:
+            # snapshots don't change, so tiles the span didn't change share them with the previous keyframe
+            previous = self.keyframes[-1]
+            keyframe = Matrix(previous.width, previous.height, list(previous))
+            for x, y in self.span_changes[-1]:
+                keyframe.set(x, y, tile_model_matrix.get(x, y).snapshot())
+            self.keyframes.append(keyframe)
+            self.span_changes.append(set())
+
+    def truncate(self, length: int) -> None:
+        """Forget the steps after the first length of them; the timeline is empty again at 0."""
+        if length == 0:
+            self.keyframes = []
+            self.deltas = []
+            self.span_changes = []
+            return
+        if length >= len(self.deltas):
+            # nothing to forget, which is the case on every step at the end of the timeline
+            return
+
+        del self.deltas[length:]
+        span_count = length // self.keyframe_interval + 1
+        del self.keyframes[span_count:]
+        del self.span_changes[span_count:]
+        last_span_start = (span_count - 1) * self.keyframe_interval
+        self.span_changes[-1] = set().union(*self.deltas[last_span_start:])
+
+    def get_changed_tiles(self, start: int, end: int) -> set[tuple[int, int]]:
+        """Return the coordinates of the tiles that may differ between the level at two steps.
+
+        Whole spans are looked at, so this may include tiles that changed back.
+        """
+        if start > end:
+            start, end = end, start
+        if start == end:
+            return set()
+        interval = self.keyframe_interval
+        first_span = start // interval
+        last_span = (end - 1) // interval
+        keyframe = self.keyframes[0]
+        if last_span - first_span >= len(keyframe):
+            # quicker to take every tile than to go through so many spans
+            return {(x, y) for x, y, _tile_snapshot in keyframe.iter_xy()}
+        return set().union(*self.span_changes[first_span : last_span + 1])
+
+    def get_tiles(self, step: int, coordinates: set[tuple[int, int]]) -> dict[tuple[int, int], TileSnapshot]:
+        """Return some tiles as they were at a step, from the keyframe before it and at most keyframe_interval - 1 deltas."""
+        keyframe_index = step // self.keyframe_interval
+        keyframe = self.keyframes[keyframe_index]
+        latest: dict[tuple[int, int], TileSnapshot] = {}
+        for delta in self.deltas[keyframe_index * self.keyframe_interval : step]:
+            latest.update(delta)
+        return {
+            (x, y): latest[x, y] if (x, y) in latest else keyframe.get(x, y)
+            for x, y in coordinates
+        }
+
+    def get_size(self) -> int:
+        """Return how many tile snapshots are stored, counting those keyframes share once."""
+        if not self.is_started():
+            return 0
+        keyframe_size = len(self.keyframes[0]) + sum(map(len, self.span_changes[: len(self.keyframes) - 1]))
+        return keyframe_size + sum(map(len, self.deltas))
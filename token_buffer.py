@@ -0,0 +1,172 @@
+"""TokenBuffer class that stores tokens as parallel arrays, and TokenCursor class to read it
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from array import array
+from bisect import bisect_right
+from itertools import repeat
+from typing import Any, Callable, Iterable, Iterator
+
+from enums import TokenType
+from pyscript_token import Token
+
+
+class TokenBuffer:
+    """A sequence of tokens without a Python object per token.
+
+    Every distinct text in the source is a lexeme, with its token type,
+    value and length kept once in side tables. A token is then just two
+    array slots: the offset of its text in the source and the index of its
+    lexeme. Lines and columns are worked out from the offset of the first
+    character of each line, so a token takes 8 bytes.
+    Token objects are built only when indexing.
+    """
+    starts: array
+    lexeme_indices: array
+    lexeme_types: list[TokenType]
+    lexeme_values: list[Any]
+    lexeme_lengths: array
+    line_starts: array # non-decreasing, so a token's line is found by bisecting them with its start
+
+    def __init__(self) -> None:
+        self.starts = array("I")
+        self.lexeme_indices = array("I")
+        self.lexeme_types = []
+        self.lexeme_values = []
+        self.lexeme_lengths = array("I")
+        self.line_starts = array("I")
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: int) -> Token:
+        lexeme_index = self.lexeme_indices[index]
+        return Token(
+            self.lexeme_types[lexeme_index],
+            self.lexeme_values[lexeme_index],
+            *self.get_position(index),
+        )
+
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def extend_lexemes(
+        self,
+        lexemes: Iterable[tuple[str, str, int, int, int]],
+        build_token: Callable[[str, str, int, int], Token],
+    ) -> None:
+        """Append (kind, text, start offset, line, column) lexemes, as made by Parser.
+
+        The same text always makes the same token, so build_token(kind, text, line, column)
+        is only called the first time a text is seen, to get its type and value.
+        """
+        lexeme_indices = self.lexeme_indices.append
+        starts = self.starts.append
+        line_starts = self.line_starts
+        known_indices: dict[str, int] = {}
+        last_line = len(line_starts)
+        for kind, text, start, line, column in lexemes:
+            lexeme_index = known_indices.get(text)
+            if lexeme_index is None:
+                token = build_token(kind, text, line, column)
+                lexeme_index = len(self.lexeme_types)
+                self.lexeme_types.append(token.type)
+                self.lexeme_values.append(token.value)
+                self.lexeme_lengths.append(len(text))
+                known_indices[text] = lexeme_index
+
+            lexeme_indices(lexeme_index)
+            starts(start)
+            if line > last_line:
+                # lines without any tokens start where the next line with one does,
+                # which keeps the starts in order without being looked up
+                line_start = start - column + 1
+                line_starts.extend(repeat(line_start, line - last_line))
+                last_line = line
+
+    def get_type(self, index: int) -> TokenType:
+        return self.lexeme_types[self.lexeme_indices[index]]
+
+    def get_value(self, index: int) -> Any:
+        return self.lexeme_values[self.lexeme_indices[index]]
+
+    def get_span(self, index: int) -> tuple[int, int]:
+        """Return the start and end offsets of a token's text in the source."""
+        start = self.starts[index]
+        return start, start + self.lexeme_lengths[self.lexeme_indices[index]]
+
+    def get_line(self, index: int) -> int:
+        return bisect_right(self.line_starts, self.starts[index])
+
+    def get_position(self, index: int) -> tuple[int, int]:
+        """Return the line and column of a token."""
+        line = self.get_line(index)
+        return line, self.starts[index] - self.line_starts[line - 1] + 1
+
+    def get_size(self) -> int:
+        """Return roughly how many bytes the token data takes, not counting shared values."""
+        return sum(
+            data.itemsize * len(data)
+            for data in (
+                self.starts,
+                self.lexeme_indices,
+                self.lexeme_lengths,
+                self.line_starts,
+            )
+        ) + 16 * len(self.lexeme_types)
+
+    def cursor(self) -> TokenCursor:
+        return TokenCursor(self)
+
+
+class TokenCursor:
+    """A read position in a TokenBuffer, for parsers to walk it without copying tokens."""
+    buffer: TokenBuffer
+    index: int
+
+    def __init__(self, buffer: TokenBuffer, index: int = 0) -> None:
+        self.buffer = buffer
+        self.index = index
+
+    def at_end(self) -> bool:
+        return self.index >= len(self.buffer)
+
+    def peek_type(self, offset: int = 0) -> TokenType | None:
+        """Return the type of the token offset places ahead, or None past the end."""
+        index = self.index + offset
+        if index >= len(self.buffer):
+            return None
+        return self.buffer.get_type(index)
+
+    def peek_value(self, offset: int = 0) -> Any:
+        index = self.index + offset
+        if index >= len(self.buffer):
+            return None
+        return self.buffer.get_value(index)
+
+    def peek_line(self) -> int:
+        """Return the line of the current token, or 0 past the end."""
+        if self.index >= len(self.buffer):
+            return 0
+        return self.buffer.get_line(self.index)
+
+    def advance(self, count: int = 1) -> None:
+        self.index += count
+
+    def get_token(self, offset: int = 0) -> Token | None:
+        """Build the Token offset places ahead, or None past the end."""
+        index = self.index + offset
+        if index >= len(self.buffer):
+            return None
+        return self.buffer[index]
+
+    def get_position(self) -> tuple[int, int]:
+        """Return the line and column of the current token, or of the last one past the end."""
+        if len(self.buffer) == 0:
+            return 0, 0
+        return self.buffer.get_position(min(self.index, len(self.buffer) - 1))
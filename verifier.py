@@ -0,0 +1,167 @@
+"""verify function that proves a compiled Program safe to run without checks
+
+Created on 2026.10.18
+Contributors:
+    Widmo
+"""
+
+from __future__ import annotations
+from dataclasses import replace
+import logging
+
+from compiler import TILE_ACTIONS
+from enums import Opcode, OperandKind
+from errors import VerificationError
+from program import INSTRUCTION_SIZES, OPERAND_KINDS, Program
+
+logger = logging.getLogger(__name__)
+
+# (values popped, values pushed) by each instruction; CALL also pops its arguments
+STACK_EFFECTS = {
+    Opcode.NOP:           (0, 0),
+    Opcode.PUSH_CONST:    (0, 1),
+    Opcode.LOAD:          (0, 1),
+    Opcode.STORE:         (1, 0),
+    Opcode.POP:           (1, 0),
+    Opcode.CALL:          (0, 1),
+    Opcode.ACT:           (0, 1),
+    Opcode.RETURN:        (1, 0),
+    Opcode.EXIT:          (1, 0),
+    Opcode.HALT:          (0, 0),
+    Opcode.NEGATE:        (1, 1),
+    Opcode.JUMP:          (0, 0),
+    Opcode.JUMP_IF_FALSE: (1, 0),
+    Opcode.LOAD_CONST_OP: (0, 1),
+    Opcode.LOAD_LOAD_OP:  (0, 1),
+    Opcode.CONST_STORE:   (0, 0),
+    }
+BINARY_STACK_EFFECT = (2, 1)
+JUMP_OPCODES = (Opcode.JUMP, Opcode.JUMP_IF_FALSE)
+# instructions after which the next one only runs if something jumps to it
+ENDING_OPCODES = (Opcode.JUMP, Opcode.RETURN, Opcode.EXIT, Opcode.HALT)
+BLOCK_ENDING_OPCODES = (*ENDING_OPCODES, Opcode.JUMP_IF_FALSE)
+OPCODES_BY_VALUE = {opcode.value: opcode for opcode in Opcode}
+
+
+def verify(program: Program) -> Program:
+    """Return the program with its max_stack_depth set, or raise VerificationError if it's unsafe.
+
+    Every instruction must be whole and valid, with operands in range, and
+    jumps must land on instructions. Then the code is split into basic
+    blocks, and every block must be entered with the same stack depth from
+    everywhere, never pop more than it has and never run past the end of the code.
+    """
+    instructions = _decode(program)
+    _check_instruction_indices(program, instructions)
+    starts = {offset for offset, _opcode, _operands in instructions}
+    for offset, opcode, operands in instructions:
+        if len(operands) > 0:
+            _check_operands(program, starts, offset, opcode, operands)
+
+    # a block starts at the code's start, at jump targets and after jumps and endings
+    leaders = {0}
+    for index, (offset, opcode, operands) in enumerate(instructions):
+        if opcode in JUMP_OPCODES:
+            leaders.add(operands[0])
+        if opcode in BLOCK_ENDING_OPCODES and index + 1 < len(instructions):
+            leaders.add(instructions[index + 1][0])
+    index_by_offset = {offset: index for index, (offset, _opcode, _operands) in enumerate(instructions)}
+
+    entry_depths = {0: 0} # block start offset -> stack depth on entry
+    pending = [0]
+    max_depth = 0
+    while pending:
+        index = index_by_offset[pending.pop()]
+        depth = entry_depths[instructions[index][0]]
+        while True:
+            offset, opcode, operands = instructions[index]
+            pops, pushes = STACK_EFFECTS.get(opcode, BINARY_STACK_EFFECT)
+            if opcode is Opcode.CALL:
+                pops = operands[1]
+            if depth < pops:
+                raise VerificationError(f"{opcode.name} needs {pops} values on the stack, which has {depth} (at offset {offset})")
+            depth += pushes - pops
+            if depth > max_depth:
+                max_depth = depth
+
+            if opcode not in ENDING_OPCODES and index + 1 == len(instructions):
+                raise VerificationError(f"Code runs past its end (at offset {offset})")
+            if opcode not in BLOCK_ENDING_OPCODES and instructions[index + 1][0] not in leaders:
+                index += 1
+                continue
+
+            successors = []
+            if opcode in JUMP_OPCODES:
+                successors.append(operands[0])
+            if opcode not in ENDING_OPCODES:
+                successors.append(instructions[index + 1][0])
+            for successor in successors:
+                if successor not in entry_depths:
+                    entry_depths[successor] = depth
+                    pending.append(successor)
+                elif entry_depths[successor] != depth:
+                    raise VerificationError(
+                        f"Stack depth at offset {successor} is {entry_depths[successor]} or {depth}, "
+                        f"depending on the way there"
+                    )
+            break
+
+    logger.debug("Verified program of %d ints, max stack depth %d", len(program.code), max_depth)
+    return replace(program, max_stack_depth=max_depth)
+
+
+def _decode(program: Program) -> list[tuple[int, Opcode, tuple[int, ...]]]:
+    """Split the code into instructions like Program.iter_instructions, but checking every opcode and length."""
+    code = program.code
+    instructions = []
+    offset = 0
+    while offset < len(code):
+        opcode = OPCODES_BY_VALUE.get(code[offset])
+        if opcode is None:
+            raise VerificationError(f"Unknown opcode {code[offset]} (at offset {offset})")
+        size = INSTRUCTION_SIZES[opcode]
+        if offset + size > len(code):
+            raise VerificationError(f"{opcode.name} is cut off by the end of the code (at offset {offset})")
+        instructions.append((offset, opcode, tuple(code[offset + 1 : offset + size])))
+        offset += size
+    if len(instructions) == 0:
+        raise VerificationError("Program has no code")
+    return instructions
+
+
+def _check_instruction_indices(program: Program, instructions: list[tuple[int, Opcode, tuple[int, ...]]]) -> None:
+    """Make sure instruction_indices count the instructions, since the fuel a program uses is counted with them."""
+    indices = program.instruction_indices
+    if len(indices) != len(program.code):
+        raise VerificationError(f"Program has {len(indices)} instruction indices for {len(program.code)} ints of code")
+    for index, (offset, opcode, _operands) in enumerate(instructions):
+        for position in range(offset, offset + INSTRUCTION_SIZES[opcode]):
+            if indices[position] != index:
+                raise VerificationError(f"Instruction index {indices[position]} should be {index} (at offset {position})")
+
+
+def _check_operands(
+    program: Program,
+    starts: set[int],
+    offset: int,
+    opcode: Opcode,
+    operands: tuple[int, ...],
+) -> None:
+    for kind, operand in zip(OPERAND_KINDS.get(opcode, ()), operands):
+        match kind:
+            case OperandKind.CONSTANT:
+                is_valid = 0 <= operand < len(program.constants)
+            case OperandKind.SLOT:
+                is_valid = 0 <= operand < len(program.slot_names)
+            case OperandKind.FUNCTION:
+                is_valid = 0 <= operand < len(program.function_names)
+            case OperandKind.COUNT:
+                is_valid = operand >= 0
+            case OperandKind.ACTION:
+                is_valid = 0 <= operand < len(TILE_ACTIONS)
+            case OperandKind.LABEL:
+                is_valid = operand in starts
+            case OperandKind.OPERATOR:
+                is_valid = operand in OPCODES_BY_VALUE and operand >= Opcode.ADD
+        if not is_valid:
+            raise VerificationError(f"{opcode.name} has an invalid {kind.name.lower()} {operand} (at offset {offset})")